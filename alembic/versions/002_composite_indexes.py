@@ -0,0 +1,30 @@
+"""Composite indexes for the common analytics access paths.
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-15
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "002"
+down_revision: str | None = "001"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_receipts_user_date", "receipts", ["user_id", "purchase_date"])
+    op.create_index(
+        "ix_receipt_items_receipt_product",
+        "receipt_items",
+        ["receipt_id", "product_id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_receipt_items_receipt_product", table_name="receipt_items")
+    op.drop_index("ix_receipts_user_date", table_name="receipts")
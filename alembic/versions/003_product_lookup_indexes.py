@@ -0,0 +1,36 @@
+"""Product lookup indexes: alias containment and fuzzy name search.
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-15
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "003"
+down_revision: str | None = "002"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_products_aliases_gin", "products", ["aliases"], postgresql_using="gin"
+    )
+    op.create_index(
+        "ix_products_canonical_trgm",
+        "products",
+        ["canonical_name"],
+        postgresql_using="gin",
+        postgresql_ops={"canonical_name": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    # The extension is left in place; other database objects may use it
+    op.drop_index("ix_products_canonical_trgm", table_name="products")
+    op.drop_index("ix_products_aliases_gin", table_name="products")
@@ -0,0 +1,39 @@
+"""Trigram indexes for substring filters on store and category names.
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-15
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "004"
+down_revision: str | None = "003"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # pg_trgm is created in revision 003
+    op.create_index(
+        "ix_stores_normalized_trgm",
+        "stores",
+        ["normalized_name"],
+        postgresql_using="gin",
+        postgresql_ops={"normalized_name": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_categories_name_trgm",
+        "categories",
+        ["name"],
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_categories_name_trgm", table_name="categories")
+    op.drop_index("ix_stores_normalized_trgm", table_name="stores")
@@ -0,0 +1,39 @@
+"""Drop single-column FK indexes covered by composite indexes.
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-15
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "005"
+down_revision: str | None = "004"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_discounts_store_product_start",
+        "discounts",
+        ["store_id", "product_id", "start_date"],
+    )
+    # Covered by ix_receipts_user_date, ix_receipt_items_receipt_product and
+    # ix_discounts_store_product_start; discounts.category_id is never looked
+    # up on its own
+    op.drop_index("ix_receipts_user_id", table_name="receipts")
+    op.drop_index("ix_receipt_items_receipt_id", table_name="receipt_items")
+    op.drop_index("ix_discounts_store_id", table_name="discounts")
+    op.drop_index("ix_discounts_category_id", table_name="discounts")
+
+
+def downgrade() -> None:
+    op.create_index("ix_discounts_category_id", "discounts", ["category_id"])
+    op.create_index("ix_discounts_store_id", "discounts", ["store_id"])
+    op.create_index("ix_receipt_items_receipt_id", "receipt_items", ["receipt_id"])
+    op.create_index("ix_receipts_user_id", "receipts", ["user_id"])
+    op.drop_index("ix_discounts_store_product_start", table_name="discounts")
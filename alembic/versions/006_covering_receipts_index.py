@@ -0,0 +1,33 @@
+"""Cover spending aggregates with the receipts user/date index.
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-15
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "006"
+down_revision: str | None = "005"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # Carries the columns the spending totals and breakdowns read, so those
+    # aggregate with index-only scans
+    op.drop_index("ix_receipts_user_date", table_name="receipts")
+    op.create_index(
+        "ix_receipts_user_date",
+        "receipts",
+        ["user_id", "purchase_date"],
+        postgresql_include=["total_amount", "id", "store_id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_receipts_user_date", table_name="receipts")
+    op.create_index("ix_receipts_user_date", "receipts", ["user_id", "purchase_date"])
@@ -11,20 +11,166 @@ import argparse
 import asyncio
 import logging
 from collections import defaultdict
+from typing import TYPE_CHECKING, Any
 
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import String, Uuid, column, func, select, update, values
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import noload
 
 from src.db.models import Product, ReceiptItem
 from src.db.session import async_session
 from src.services.product import ProductMatcher
 from src.services.product_intelligence import ProductIntelligenceService
 
+if TYPE_CHECKING:
+    import uuid
+
+    from sqlalchemy.ext.asyncio import AsyncSession
+
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s"
 )
 logger = logging.getLogger(__name__)
 
+# Receipt names sampled per product as extra context for enrichment
+SAMPLE_NAMES_PER_PRODUCT = 5
+
+# Upper bound on stored aliases per product
+MAX_ALIASES_PER_PRODUCT = 50
+
+# Products fetched per server-side cursor round-trip
+STREAM_CHUNK_SIZE = 50
+
+
+def _normalize_name(name: str) -> str:
+    """Case-fold and collapse whitespace for grouping receipt names."""
+    return " ".join(name.casefold().split())
+
+
+async def _enrich_products(
+    session: AsyncSession,
+    products: list[Product],
+    matcher: ProductMatcher,
+    intelligence: ProductIntelligenceService,
+) -> int:
+    """Fill aliases/categories for one chunk of products; return how many changed."""
+    # Fetch at most SAMPLE_NAMES_PER_PRODUCT receipt names per product in one
+    # query instead of loading every receipt item of the chunk.
+    ranked_items = (
+        select(
+            ReceiptItem.product_id,
+            ReceiptItem.name_on_receipt,
+            func.row_number()
+            .over(partition_by=ReceiptItem.product_id, order_by=ReceiptItem.id)
+            .label("rn"),
+        )
+        .where(ReceiptItem.product_id.in_([p.id for p in products]))
+        .cte("ranked_items")
+    )
+    names_stmt = select(
+        ranked_items.c.product_id, ranked_items.c.name_on_receipt
+    ).where(ranked_items.c.rn <= SAMPLE_NAMES_PER_PRODUCT)
+    names_result = await session.execute(names_stmt)
+    names_by_product: dict[uuid.UUID, list[str]] = defaultdict(list)
+    for product_id, name_on_receipt in names_result.all():
+        names_by_product[product_id].append(name_on_receipt)
+
+    # Enrich every product's sample names together; enrich_items splits them
+    # into batches that fit one LLM response each.
+    samples: list[tuple[Product, set[str]]] = []
+    all_names: set[str] = set()
+    for product in products:
+        sample_names = {product.canonical_name}
+        sample_names.update(product.aliases or [])
+        sample_names.update(name for name in names_by_product[product.id] if name)
+        samples.append((product, sample_names))
+        all_names.update(sample_names)
+
+    enriched_all = await intelligence.enrich_items(list(all_names))
+
+    # Collect per-product changes and write them back in bulk rather than
+    # dirtying each ORM instance.
+    updates: list[dict[str, Any]] = []
+    alias_appends: list[tuple[uuid.UUID, list[str]]] = []
+    for product, sample_names in samples:
+        best = enriched_all.get(product.canonical_name)
+        if not best:
+            continue
+
+        dirty = False
+        canonical_name = product.canonical_name
+        if best.canonical_name_en and best.canonical_name_en != canonical_name:
+            canonical_name = best.canonical_name_en
+            dirty = True
+
+        # Candidate aliases keyed by their case-folded form; first spelling wins.
+        candidates: dict[str, str] = {}
+        for name in sample_names:
+            item = enriched_all.get(name.strip())
+            if item is None:
+                continue
+            for alias in item.aliases_en:
+                candidates.setdefault(alias.casefold(), alias)
+
+        category_id = product.category_id
+        if category_id is None:
+            resolved_product, _ = await matcher.find_or_create_product(
+                canonical_name,
+                session,
+                item_intelligence=best,
+            )
+            if resolved_product.category_id:
+                category_id = resolved_product.category_id
+                dirty = True
+
+        # Checked after the matcher, which may have appended aliases itself
+        current_aliases = product.aliases or []
+        current_aliases_cf = {a.casefold() for a in current_aliases}
+        new_aliases: list[str] = []
+        for key, alias in candidates.items():
+            if len(current_aliases) + len(new_aliases) >= MAX_ALIASES_PER_PRODUCT:
+                break
+            if key not in current_aliases_cf:
+                new_aliases.append(alias)
+                current_aliases_cf.add(key)
+        if new_aliases:
+            alias_appends.append((product.id, new_aliases))
+
+        if dirty:
+            updates.append(
+                {
+                    "id": product.id,
+                    "canonical_name": canonical_name,
+                    "category_id": category_id,
+                }
+            )
+
+    if updates:
+        await session.execute(update(Product), updates)
+
+    # Append only the new aliases, in one UPDATE ... FROM (VALUES ...), so
+    # aliases the matcher appended since the chunk was read are kept.
+    if alias_appends:
+        append_values = values(
+            column("product_id", Uuid),
+            column("new_aliases", ARRAY(String(255))),
+            name="alias_appends",
+        ).data(alias_appends)
+        await session.execute(
+            update(Product)
+            .where(Product.id == append_values.c.product_id)
+            .values(
+                aliases=func.array_cat(
+                    Product.aliases,
+                    append_values.c.new_aliases,
+                    type_=ARRAY(String(255)),
+                )[1:MAX_ALIASES_PER_PRODUCT]
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    return len({row["id"] for row in updates} | {pid for pid, _ in alias_appends})
+
 
 async def _reprocess(dry_run: bool, batch_size: int) -> None:
     matcher = ProductMatcher()
@@ -33,81 +179,63 @@ async def _reprocess(dry_run: bool, batch_size: int) -> None:
     linked_items = 0
 
     async with async_session() as session:
-        # 1) Fill aliases/categories for existing products in batches.
+        # 1) Fill aliases/categories for existing products, streamed in chunks.
         products_stmt = (
             select(Product)
-            .options(selectinload(Product.receipt_items))
+            .options(noload(Product.receipt_items))
             .limit(batch_size)
+            .execution_options(yield_per=STREAM_CHUNK_SIZE)
         )
-        products_result = await session.execute(products_stmt)
-        products = list(products_result.scalars().all())
-
-        for product in products:
-            sample_names = {product.canonical_name}
-            sample_names.update(product.aliases or [])
-            sample_names.update(
-                item.name_on_receipt
-                for item in product.receipt_items[:5]
-                if item.name_on_receipt
+        products_result = await session.stream(products_stmt)
+        async for partition in products_result.scalars().partitions():
+            updated_products += await _enrich_products(
+                session, list(partition), matcher, intelligence
             )
-            enriched = await intelligence.enrich_items(list(sample_names))
-            best = enriched.get(product.canonical_name)
-            if not best:
-                continue
-
-            if (
-                best.canonical_name_en
-                and best.canonical_name_en != product.canonical_name
-            ):
-                product.canonical_name = best.canonical_name_en
-                updated_products += 1
-
-            current_aliases = list(product.aliases or [])
-            current_aliases_lc = {a.lower() for a in current_aliases}
-            for item in enriched.values():
-                for alias in item.aliases_en:
-                    if (
-                        alias.lower() not in current_aliases_lc
-                        and len(current_aliases) < 50
-                    ):
-                        current_aliases.append(alias)
-                        current_aliases_lc.add(alias.lower())
-                        updated_products += 1
-            product.aliases = current_aliases
-
-            if product.category_id is None:
-                resolved_product, _ = await matcher.find_or_create_product(
-                    product.canonical_name,
-                    session,
-                    item_intelligence=best,
-                )
-                if resolved_product.category_id:
-                    product.category_id = resolved_product.category_id
-                    updated_products += 1
+            # Keep the identity map bounded to a single chunk.
+            await session.flush()
+            session.expunge_all()
 
         # 2) Link orphan receipt items.
         orphan_stmt = (
-            select(ReceiptItem)
+            select(ReceiptItem.id, ReceiptItem.name_on_receipt)
             .where(ReceiptItem.product_id.is_(None))
             .limit(batch_size)
         )
         orphan_result = await session.execute(orphan_stmt)
-        orphans = list(orphan_result.scalars().all())
 
-        by_name: dict[str, list[ReceiptItem]] = defaultdict(list)
-        for item in orphans:
-            by_name[item.name_on_receipt].append(item)
+        # Bucket by normalized name so spelling variants ("Milk 1L",
+        # "milk 1l  ") share one lookup; the first spelling seen is used.
+        by_name: dict[str, list[uuid.UUID]] = defaultdict(list)
+        key_to_name: dict[str, str] = {}
+        for item_id, name_on_receipt in orphan_result.all():
+            key = _normalize_name(name_on_receipt)
+            key_to_name.setdefault(key, name_on_receipt)
+            by_name[key_to_name[key]].append(item_id)
 
         enriched_orphans = await intelligence.enrich_items(list(by_name.keys()))
-        for name, items in by_name.items():
+        links: list[tuple[uuid.UUID, uuid.UUID]] = []
+        for name, item_ids in by_name.items():
             product, _ = await matcher.find_or_create_product(
                 name,
                 session,
                 item_intelligence=enriched_orphans.get(name),
             )
-            for item in items:
-                item.product_id = product.id
-                linked_items += 1
+            links.extend((item_id, product.id) for item_id in item_ids)
+
+        # Link every orphan in a single UPDATE ... FROM (VALUES ...) statement.
+        if links:
+            link_values = values(
+                column("item_id", Uuid),
+                column("product_id", Uuid),
+                name="links",
+            ).data(links)
+            await session.execute(
+                update(ReceiptItem)
+                .where(ReceiptItem.id == link_values.c.item_id)
+                .values(product_id=link_values.c.product_id)
+                .execution_options(synchronize_session=False)
+            )
+            linked_items = len(links)
 
         if dry_run:
             await session.rollback()
@@ -139,4 +267,10 @@ def _parse_args() -> argparse.Namespace:
 
 if __name__ == "__main__":
     args = _parse_args()
-    asyncio.run(_reprocess(dry_run=args.dry_run, batch_size=args.batch_size))
+    # uvloop is optional; fall back to the stdlib event loop when not installed.
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(_reprocess(dry_run=args.dry_run, batch_size=args.batch_size))
+    else:
+        uvloop.run(_reprocess(dry_run=args.dry_run, batch_size=args.batch_size))
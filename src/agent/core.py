@@ -1,37 +1,54 @@
 """Core LLM agent loop: processes messages, executes tool calls, returns responses."""
 
-import json
+import asyncio
 import logging
+import os
 from datetime import UTC, datetime
 from typing import Any
 
 import litellm
+import orjson
 
 from src.agent.prompts import build_system_prompt
-from src.agent.tool_executor import ToolExecutor
+from src.agent.tool_executor import is_read_only_tool, tool_executor
 from src.agent.tools import TOOL_DEFINITIONS
 from src.config import settings
 from src.db.models import User
 
 logger = logging.getLogger(__name__)
 
+# Set API keys for LiteLLM (provider-specific via environment), once at import
+if settings.openai_api_key and not os.environ.get("OPENAI_API_KEY"):
+    os.environ["OPENAI_API_KEY"] = settings.openai_api_key
+if settings.gemini_api_key and not os.environ.get("GEMINI_API_KEY"):
+    os.environ["GEMINI_API_KEY"] = settings.gemini_api_key
+
 # Maximum number of tool-call rounds before forcing a final response
 MAX_TOOL_ROUNDS = 10
 
+# Maximum number of prior conversation messages sent with each request
+MAX_HISTORY_TURNS = 12
+
+# Process-wide cap on in-flight conversational LLM calls; a burst of messages
+# queues here instead of opening one provider request each
+_LLM_SEMAPHORE = asyncio.Semaphore(settings.agent_concurrency)
+
 
 class AgentCore:
     """The central LLM agent that processes user messages through tool-calling."""
 
     def __init__(self) -> None:
-        self.tool_executor = ToolExecutor()
-
-        # Set API keys for LiteLLM (provider-specific via environment)
-        import os
+        self.tool_executor = tool_executor
 
-        if settings.openai_api_key:
-            os.environ.setdefault("OPENAI_API_KEY", settings.openai_api_key)
-        if settings.gemini_api_key:
-            os.environ.setdefault("GEMINI_API_KEY", settings.gemini_api_key)
+        # Request options that never change between calls, built once so the
+        # per-round call only supplies the growing message list.
+        self._completion_kwargs: dict[str, Any] = {
+            "model": settings.conversational_model,
+            "tools": TOOL_DEFINITIONS,
+            "tool_choice": "auto",
+            "temperature": 0.3,
+            "max_tokens": 2048,
+        }
 
     async def process_message(
         self,
@@ -65,26 +82,29 @@ class AgentCore:
 
         messages: list[dict[str, Any]] = [{"role": "system", "content": system_prompt}]
 
-        # Add conversation history if provided
+        # Add the most recent conversation history, if provided. The window must
+        # not start with tool results whose assistant tool call was cut off.
         if conversation_history:
-            messages.extend(conversation_history)
+            history = conversation_history[-MAX_HISTORY_TURNS:]
+            while history and history[0].get("role") == "tool":
+                history = history[1:]
+            messages.extend(history)
 
         # Add the current user message
         messages.append({"role": "user", "content": message_text})
 
+        # Result of every (tool name, raw arguments) pair from completed rounds
+        seen_results: dict[tuple[str, str], str] = {}
+
         # Agent loop: call LLM, execute tools, repeat
         for round_num in range(MAX_TOOL_ROUNDS):
             logger.debug("Agent round %d for user %s", round_num + 1, user.telegram_id)
 
             try:
-                response = await litellm.acompletion(
-                    model=settings.conversational_model,
-                    messages=messages,
-                    tools=TOOL_DEFINITIONS,
-                    tool_choice="auto",
-                    temperature=0.3,
-                    max_tokens=2048,
-                )
+                async with _LLM_SEMAPHORE:
+                    response = await litellm.acompletion(
+                        messages=messages, **self._completion_kwargs
+                    )
             except Exception:
                 logger.exception("LLM API call failed in round %d", round_num + 1)
                 return "Sorry, I'm having trouble connecting to my AI service right now. Please try again in a moment."
@@ -104,50 +124,64 @@ class AgentCore:
 
             # The LLM wants to call tools -- execute them
             # Add the assistant's message (with tool_calls) to the conversation
-            messages.append(assistant_message.model_dump())
-
-            for tool_call in assistant_message.tool_calls:
-                function_name = tool_call.function.name
-                try:
-                    arguments = json.loads(tool_call.function.arguments)
-                except json.JSONDecodeError:
-                    arguments = {}
-
-                logger.info(
-                    "Executing tool: %s(%s) for user %s",
-                    function_name,
-                    json.dumps(arguments, default=str)[:200],
-                    user.telegram_id,
-                )
-
-                # Execute the tool
-                try:
-                    result = await self.tool_executor.execute(
-                        tool_name=function_name,
-                        arguments=arguments,
-                        user=user,
-                    )
-                except Exception as e:
-                    logger.exception("Tool execution failed: %s", function_name)
-                    result = f"Error executing {function_name}: {e!s}"
+            messages.append(
+                {
+                    "role": "assistant",
+                    "content": assistant_message.content,
+                    "tool_calls": [
+                        {
+                            "id": tool_call.id,
+                            "type": "function",
+                            "function": {
+                                "name": tool_call.function.name,
+                                "arguments": tool_call.function.arguments,
+                            },
+                        }
+                        for tool_call in assistant_message.tool_calls
+                    ],
+                }
+            )
 
-                # Add tool result to conversation
+            results = await self._exec_round(assistant_message.tool_calls, user)
+            repeated = False
+            round_results: dict[tuple[str, str], str] = {}
+            for tool_call, content in zip(
+                assistant_message.tool_calls, results, strict=True
+            ):
                 messages.append(
                     {
                         "role": "tool",
                         "tool_call_id": tool_call.id,
-                        "content": json.dumps(result, default=str)
-                        if not isinstance(result, str)
-                        else result,
+                        "content": content,
                     }
                 )
+                key = (tool_call.function.name, tool_call.function.arguments)
+                # Only earlier rounds count: a duplicate within one parallel
+                # batch is not the model going in circles
+                if seen_results.get(key) == content:
+                    repeated = True
+                round_results[key] = content
+            seen_results.update(round_results)
 
-        # If we exhausted all rounds, ask the LLM for a final response without tools
-        logger.warning(
-            "Agent reached max rounds (%d) for user %s",
-            MAX_TOOL_ROUNDS,
-            user.telegram_id,
-        )
+            # The LLM re-issued a call that already returned this exact result --
+            # further rounds are unlikely to make progress.
+            if repeated:
+                logger.warning(
+                    "Repeated tool call with identical result in round %d for user %s",
+                    round_num + 1,
+                    user.telegram_id,
+                )
+                break
+        else:
+            logger.warning(
+                "Agent reached max rounds (%d) for user %s",
+                MAX_TOOL_ROUNDS,
+                user.telegram_id,
+            )
+
+        # Out of rounds (or stuck): ask the LLM for a final response without
+        # tools. Any text from the last round was written before it saw that
+        # round's tool results, so it is not a substitute for this call.
         messages.append(
             {
                 "role": "user",
@@ -156,12 +190,13 @@ class AgentCore:
         )
 
         try:
-            response = await litellm.acompletion(
-                model=settings.conversational_model,
-                messages=messages,
-                temperature=0.3,
-                max_tokens=2048,
-            )
+            async with _LLM_SEMAPHORE:
+                response = await litellm.acompletion(
+                    model=settings.conversational_model,
+                    messages=messages,
+                    temperature=0.3,
+                    max_tokens=2048,
+                )
             return (
                 response.choices[0].message.content
                 or "I wasn't able to complete your request. Please try rephrasing."
@@ -169,3 +204,61 @@ class AgentCore:
         except Exception:
             logger.exception("Final LLM call failed")
             return "Sorry, something went wrong. Please try again."
+
+    async def _exec_round(self, tool_calls: list[Any], user: User) -> list[str]:
+        """Execute one round of tool calls, returning results in request order.
+
+        Read-only tools run concurrently. Tools that write run one at a time,
+        in the order the LLM requested them, alongside the reads.
+        """
+        results = [""] * len(tool_calls)
+
+        async def run(indices: list[int]) -> None:
+            for i in indices:
+                results[i] = await self._exec_one(tool_calls[i], user)
+
+        reads: list[int] = []
+        writes: list[int] = []
+        for i, tool_call in enumerate(tool_calls):
+            if is_read_only_tool(tool_call.function.name):
+                reads.append(i)
+            else:
+                writes.append(i)
+
+        await asyncio.gather(*(run([i]) for i in reads), run(writes))
+        return results
+
+    async def _exec_one(self, tool_call: Any, user: User) -> str:
+        """Execute a single tool call and return its serialized result."""
+        function_name = tool_call.function.name
+        try:
+            arguments = orjson.loads(tool_call.function.arguments)
+        except orjson.JSONDecodeError:
+            arguments = {}
+
+        logger.info(
+            "Executing tool: %s(%s) for user %s",
+            function_name,
+            orjson.dumps(arguments, default=str).decode()[:200],
+            user.telegram_id,
+        )
+
+        try:
+            result = await self.tool_executor.execute(
+                tool_name=function_name,
+                arguments=arguments,
+                user=user,
+            )
+        except Exception as e:
+            logger.exception("Tool execution failed: %s", function_name)
+            result = f"Error executing {function_name}: {e!s}"
+
+        if isinstance(result, str):
+            return result
+        return orjson.dumps(
+            result, default=str, option=orjson.OPT_NON_STR_KEYS
+        ).decode()
+
+
+# Process-wide agent: request options and the tool executor are set up once
+agent_core = AgentCore()
@@ -1,5 +1,8 @@
 """System prompts for the LLM agent."""
 
+from functools import lru_cache
+from string import Formatter
+
 SYSTEM_PROMPT = """You are LuxTick, a personal assistant that helps users track \
 their purchases, manage receipts, maintain shopping lists, and analyze spending patterns.
 
@@ -55,6 +58,14 @@ Current date: {current_date}
 """
 
 
+# Template split once at import into (literal, field) pairs so building a
+# prompt is a single join instead of re-parsing the template every message.
+_PROMPT_SEGMENTS: tuple[tuple[str, str | None], ...] = tuple(
+    (literal, field) for literal, field, _, _ in Formatter().parse(SYSTEM_PROMPT)
+)
+
+
+@lru_cache(maxsize=1024)
 def build_system_prompt(
     user_name: str,
     user_id: str,
@@ -63,10 +74,14 @@ def build_system_prompt(
     current_date: str = "",
 ) -> str:
     """Build the system prompt with user context injected."""
-    return SYSTEM_PROMPT.format(
-        user_name=user_name,
-        user_id=user_id,
-        currency=currency,
-        timezone=timezone,
-        current_date=current_date,
+    values = {
+        "user_name": user_name,
+        "user_id": user_id,
+        "currency": currency,
+        "timezone": timezone,
+        "current_date": current_date,
+    }
+    return "".join(
+        literal + (values[field] if field is not None else "")
+        for literal, field in _PROMPT_SEGMENTS
     )
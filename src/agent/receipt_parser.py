@@ -1,18 +1,34 @@
 """Receipt parsing pipeline: extracts structured data from receipt photos using GPT-4o vision."""
 
+import asyncio
 import base64
-import json
+import hashlib
+import io
 import logging
-import uuid
+import random
+import time
+from dataclasses import dataclass
 from datetime import date
 from decimal import Decimal
-from typing import Any
+from typing import Any, Final
 
 import litellm
-from pydantic import BaseModel, Field
-
+from litellm.exceptions import (
+    APIConnectionError,
+    InternalServerError,
+    RateLimitError,
+    ServiceUnavailableError,
+    Timeout,
+)
+from PIL import Image
+from pydantic import BaseModel, Field, ValidationError
+
+from src.agent.tool_executor import tool_executor
+from src.cache import TTLCache
 from src.config import settings
-from src.db.models import Receipt, ReceiptItem, User
+from src.db.bulk import copy_receipt_items
+from src.db.ids import uuid7
+from src.db.models import Receipt, User
 from src.db.session import async_session
 from src.services.product import ProductMatcher
 from src.services.product_intelligence import ProductIntelligenceService
@@ -20,6 +36,78 @@ from src.services.purchase import PurchaseService
 
 logger = logging.getLogger(__name__)
 
+# Retry policy for transient vision-model failures (throttling, 5xx, network)
+VISION_MAX_ATTEMPTS = 3
+VISION_RETRY_BASE_DELAY = 1.0
+VISION_RETRY_MAX_DELAY = 30.0
+_RETRYABLE_LLM_ERRORS: tuple[type[Exception], ...] = (
+    RateLimitError,
+    APIConnectionError,
+    InternalServerError,
+    ServiceUnavailableError,
+    Timeout,
+)
+
+
+class _RateLimiter:
+    """Spaces calls at least 1/rps seconds apart across all concurrent callers."""
+
+    def __init__(self, rps: float) -> None:
+        self._interval = 1.0 / rps if rps > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait until the next call slot is available."""
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self._interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+# Process-wide limits on vision calls, shared by every ReceiptParser instance
+_VISION_SEMAPHORE = asyncio.Semaphore(settings.vision_concurrency)
+_VISION_RATE_LIMITER = _RateLimiter(settings.vision_rps)
+
+# Receipt photos above _VISION_MAX_BYTES are downscaled to this longest edge
+# and re-encoded before upload
+VISION_MAX_EDGE_PX = 1536
+VISION_JPEG_QUALITY = 85
+_VISION_MAX_BYTES = settings.vision_max_bytes
+
+
+def _downscale_image(image_data: bytes) -> bytes:
+    """Shrink a photo to VISION_MAX_EDGE_PX and re-encode it as JPEG.
+
+    Returns the original bytes if the image cannot be decoded.
+    """
+    try:
+        with Image.open(io.BytesIO(image_data)) as img:
+            img.thumbnail(
+                (VISION_MAX_EDGE_PX, VISION_MAX_EDGE_PX), Image.Resampling.LANCZOS
+            )
+            buf = io.BytesIO()
+            img.convert("RGB").save(
+                buf, "JPEG", quality=VISION_JPEG_QUALITY, optimize=True
+            )
+    except (OSError, ValueError):
+        logger.warning("Could not downscale receipt image, sending it unchanged")
+        return image_data
+    return buf.getvalue()
+
+
+# How long an extraction result is reused for a re-sent identical image
+VISION_CACHE_TTL_SECONDS = 24 * 60 * 60
+
+# In-process LRU of extraction results (JSON) keyed by image digest
+_VISION_CACHE: TTLCache | None = (
+    TTLCache(settings.vision_cache_size, VISION_CACHE_TTL_SECONDS)
+    if settings.vision_cache_enabled
+    else None
+)
+
 
 # ---------------------------------------------------------------------------
 # Pydantic schemas for the structured receipt extraction
@@ -30,13 +118,13 @@ class ExtractedItem(BaseModel):
     """A single item extracted from a receipt."""
 
     name: str = Field(description="Product name as printed on the receipt")
-    quantity: float = Field(default=1.0, description="Quantity purchased")
+    quantity: Decimal = Field(default=Decimal(1), description="Quantity purchased")
     unit: str | None = Field(
         default=None, description="Unit of measurement if applicable"
     )
-    unit_price: float = Field(description="Price per unit")
-    total_price: float = Field(description="Total price for this line item")
-    discount_amount: float | None = Field(
+    unit_price: Decimal = Field(description="Price per unit")
+    total_price: Decimal = Field(description="Total price for this line item")
+    discount_amount: Decimal | None = Field(
         default=None, description="Discount amount if any"
     )
     discount_type: str | None = Field(
@@ -55,9 +143,9 @@ class ExtractedReceipt(BaseModel):
         default=None, description="Purchase date in ISO format (YYYY-MM-DD)"
     )
     items: list[ExtractedItem] = Field(description="List of purchased items")
-    subtotal: float | None = Field(default=None, description="Subtotal before tax")
-    tax: float | None = Field(default=None, description="Tax amount")
-    total: float = Field(description="Final total amount")
+    subtotal: Decimal | None = Field(default=None, description="Subtotal before tax")
+    tax: Decimal | None = Field(default=None, description="Tax amount")
+    total: Decimal = Field(description="Final total amount")
     currency: str = Field(default="EUR", description="Currency code")
     confidence_notes: list[str] = Field(
         default_factory=list,
@@ -69,7 +157,7 @@ class ExtractedReceipt(BaseModel):
 # Vision extraction prompt
 # ---------------------------------------------------------------------------
 
-RECEIPT_EXTRACTION_PROMPT = """You are an expert receipt OCR and data extraction specialist with 10+ years experience processing receipts from global retailers including Europe. You excel at accurately identifying logical line items even when products span multiple printed lines.
+RECEIPT_EXTRACTION_PROMPT: Final = """You are an expert receipt OCR and data extraction specialist with 10+ years experience processing receipts from global retailers including Europe. You excel at accurately identifying logical line items even when products span multiple printed lines.
 
 CRITICAL RULES - Follow EXACTLY to ensure perfect extraction:
 
@@ -111,8 +199,7 @@ CRITICAL RULES - Follow EXACTLY to ensure perfect extraction:
 5. Find subtotal/tax/total lines
 6. Extract footer info
 
-## REQUIRED JSON OUTPUT - EXACTLY (no extra text):
-```json
+## REQUIRED JSON OUTPUT:
 {
   "store_name": "string",
   "store_address": "string or null",
@@ -134,7 +221,6 @@ CRITICAL RULES - Follow EXACTLY to ensure perfect extraction:
   "currency": "EUR",
   "confidence_notes": []
 }
-```
 
 ## EXAMPLE 1 - Multi-line item:
 Receipt lines:
@@ -152,7 +238,29 @@ CHIPS 2PK  2.49  2.49
 ```
 → Ignore REF, extract only CHIPS item.
 
-ANALYZE THIS RECEIPT IMAGE AND OUTPUT ONLY VALID JSON."""
+ANALYZE THIS RECEIPT IMAGE AND OUTPUT THE JSON OBJECT."""
+
+
+@dataclass(slots=True)
+class MatchedItem:
+    """A stored receipt item with the canonical product it was matched to."""
+
+    name: str
+    canonical: str
+    is_new: bool
+    qty: Decimal
+    price: Decimal
+
+
+def _parse_purchase_date(value: str | None) -> date | None:
+    """Parse an ISO purchase date, or return None if it is missing or malformed."""
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        logger.warning("Unparseable purchase date on receipt: %r", value)
+        return None
 
 
 class ReceiptParser:
@@ -172,50 +280,61 @@ class ReceiptParser:
         Returns:
             Parsed receipt data as an ExtractedReceipt model.
         """
-        # Encode image to base64
-        b64_image = base64.b64encode(image_data).decode("utf-8")
+        # Identical image bytes (re-sends, Telegram retries) reuse the last result.
+        # Hashing a multi-megabyte photo runs off the event loop; hashlib
+        # releases the GIL for large inputs. Without a cache there is no need
+        # for the digest at all.
+        digest: str | None = None
+        if _VISION_CACHE is not None:
+            hasher = await asyncio.to_thread(
+                hashlib.blake2b, image_data, digest_size=16
+            )
+            digest = hasher.hexdigest()
+            cached = _VISION_CACHE.get(digest)
+            if cached is not None:
+                logger.info("Reusing cached extraction for receipt image %s", digest)
+                return ExtractedReceipt.model_validate_json(cached)
+
+        # Large phone photos cost upload time and image tokens without helping OCR
+        if len(image_data) > _VISION_MAX_BYTES:
+            image_data = await asyncio.to_thread(_downscale_image, image_data)
+
+        # Encode image to base64 off the event loop (CPU-bound for large photos)
+        encoded = await asyncio.to_thread(base64.b64encode, image_data)
+        b64_image = encoded.decode("ascii")
 
         # Determine image type (assume JPEG for photos from Telegram)
         image_url = f"data:image/jpeg;base64,{b64_image}"
 
         logger.info("Sending receipt image to vision model for extraction...")
 
-        response = await litellm.acompletion(
+        response = await self._acompletion_with_retry(
             model=settings.vision_model,
+            # The invariant instructions go first, as a system message, so
+            # providers can reuse their cached prompt prefix across requests.
             messages=[
+                {"role": "system", "content": RECEIPT_EXTRACTION_PROMPT},
                 {
                     "role": "user",
                     "content": [
-                        {"type": "text", "text": RECEIPT_EXTRACTION_PROMPT},
                         {
                             "type": "image_url",
                             "image_url": {"url": image_url, "detail": "high"},
                         },
                     ],
-                }
+                },
             ],
             temperature=0.1,
             max_tokens=4096,
+            response_format={"type": "json_object"},
         )
 
         raw_content = response.choices[0].message.content
         logger.debug("Vision model raw response: %s", raw_content[:500])
 
-        # Parse the JSON response
-        # Strip markdown code fences if present
-        cleaned = raw_content.strip()
-        if cleaned.startswith("```"):
-            # Remove opening fence
-            first_newline = cleaned.index("\n")
-            cleaned = cleaned[first_newline + 1 :]
-        if cleaned.endswith("```"):
-            cleaned = cleaned[:-3]
-        cleaned = cleaned.strip()
-
         try:
-            data = json.loads(cleaned)
-            extracted = ExtractedReceipt(**data)
-        except (json.JSONDecodeError, ValueError) as e:
+            extracted = ExtractedReceipt.model_validate_json(raw_content)
+        except ValidationError as e:
             logger.error("Failed to parse vision model response: %s", e)
             raise ValueError(
                 f"Could not parse the receipt data from the image. Error: {e}"
@@ -228,8 +347,38 @@ class ReceiptParser:
             extracted.total,
         )
 
+        if _VISION_CACHE is not None and digest is not None:
+            _VISION_CACHE.set(digest, extracted.model_dump_json())
+
         return extracted
 
+    async def _acompletion_with_retry(self, **kwargs: Any) -> Any:
+        """Call litellm.acompletion, retrying transient errors with jittered backoff."""
+        for attempt in range(1, VISION_MAX_ATTEMPTS):
+            try:
+                return await self._throttled_acompletion(**kwargs)
+            except _RETRYABLE_LLM_ERRORS as e:
+                delay = min(
+                    VISION_RETRY_MAX_DELAY, VISION_RETRY_BASE_DELAY * 2 ** (attempt - 1)
+                ) + random.uniform(0, VISION_RETRY_BASE_DELAY)
+                logger.warning(
+                    "Vision call failed (%s), retrying in %.1fs (attempt %d/%d)",
+                    type(e).__name__,
+                    delay,
+                    attempt,
+                    VISION_MAX_ATTEMPTS,
+                )
+                await asyncio.sleep(delay)
+
+        # Final attempt: let any error propagate to the caller
+        return await self._throttled_acompletion(**kwargs)
+
+    async def _throttled_acompletion(self, **kwargs: Any) -> Any:
+        """Call litellm.acompletion within the global concurrency and rate limits."""
+        async with _VISION_SEMAPHORE:
+            await _VISION_RATE_LIMITER.acquire()
+            return await litellm.acompletion(**kwargs)
+
     async def parse_and_store(
         self,
         user: User,
@@ -250,6 +399,16 @@ class ReceiptParser:
             [item.name for item in extracted.items]
         )
 
+        # Validate the date before opening a transaction
+        purchase_date = _parse_purchase_date(extracted.purchase_date)
+        if purchase_date is None:
+            if extracted.purchase_date:
+                extracted.confidence_notes.append(
+                    f"Could not read the purchase date ({extracted.purchase_date}), "
+                    "used today's date instead"
+                )
+            purchase_date = date.today()
+
         # Step 2: Store in database
         async with async_session() as session:
             # Find or create store
@@ -257,27 +416,23 @@ class ReceiptParser:
                 extracted.store_name, session
             )
 
-            # Parse date
-            purchase_date = (
-                date.fromisoformat(extracted.purchase_date)
-                if extracted.purchase_date
-                else date.today()
-            )
-
             # Create receipt
             receipt = Receipt(
-                id=uuid.uuid4(),
+                id=uuid7(),
                 user_id=user.id,
                 store_id=store.id,
                 purchase_date=purchase_date,
-                total_amount=Decimal(str(extracted.total)),
+                total_amount=extracted.total,
                 currency=extracted.currency,
             )
             session.add(receipt)
             await session.flush()
 
-            # Step 3: Match items to canonical products and create receipt items
-            matched_items: list[dict[str, Any]] = []
+            # Step 3: Match items to canonical products and create receipt items.
+            # Matching stays sequential: the matcher queries and commits on the
+            # shared session, which does not support concurrent use.
+            matched_items: list[MatchedItem] = []
+            receipt_items: list[dict[str, Any]] = []
             for item in extracted.items:
                 product, is_new = await self.product_matcher.find_or_create_product(
                     item.name,
@@ -285,36 +440,40 @@ class ReceiptParser:
                     item_intelligence=intelligence_map.get(item.name),
                 )
 
-                receipt_item = ReceiptItem(
-                    id=uuid.uuid4(),
-                    receipt_id=receipt.id,
-                    product_id=product.id,
-                    name_on_receipt=item.name,
-                    quantity=Decimal(str(item.quantity)),
-                    unit=item.unit,
-                    unit_price=Decimal(str(item.unit_price)),
-                    total_price=Decimal(str(item.total_price)),
-                    discount_amount=(
-                        Decimal(str(item.discount_amount))
-                        if item.discount_amount
-                        else None
-                    ),
-                    discount_type=item.discount_type,
+                receipt_items.append(
+                    {
+                        "id": uuid7(),
+                        "receipt_id": receipt.id,
+                        "product_id": product.id,
+                        "name_on_receipt": item.name,
+                        "quantity": item.quantity,
+                        "unit": item.unit,
+                        "unit_price": item.unit_price,
+                        "total_price": item.total_price,
+                        "discount_amount": item.discount_amount or None,
+                        "discount_type": item.discount_type,
+                    }
                 )
-                session.add(receipt_item)
 
                 matched_items.append(
-                    {
-                        "name": item.name,
-                        "canonical": product.canonical_name,
-                        "is_new": is_new,
-                        "qty": item.quantity,
-                        "price": item.total_price,
-                    }
+                    MatchedItem(
+                        name=item.name,
+                        canonical=product.canonical_name,
+                        is_new=is_new,
+                        qty=item.quantity,
+                        price=item.total_price,
+                    )
                 )
 
+            # Products created above must exist before the items reference
+            # them; the items themselves go in one COPY
+            await session.flush()
+            await copy_receipt_items(session, receipt_items)
             await session.commit()
 
+        # The new purchases make cached search and analytics results stale
+        tool_executor.invalidate_cache()
+
         # Step 4: Build summary for user
         summary = self._build_summary(
             store_name=store.name,
@@ -328,12 +487,12 @@ class ReceiptParser:
 
         return summary
 
+    @staticmethod
     def _build_summary(
-        self,
         store_name: str,
         purchase_date: date,
-        items: list[dict[str, Any]],
-        total: float,
+        items: list[MatchedItem],
+        total: Decimal,
         currency: str,
         confidence_notes: list[str],
         receipt_id: str,
@@ -347,21 +506,24 @@ class ReceiptParser:
             "",
         ]
 
-        for item in items:
-            qty_str = f"{item['qty']}x " if item["qty"] != 1 else ""
-            new_badge = " (new product)" if item["is_new"] else ""
-            lines.append(
-                f"- {qty_str}{item['name']} -- {item['price']:.2f} {currency}{new_badge}"
-            )
+        lines.extend(
+            f"- {f'{item.qty}x ' if item.qty != 1 else ''}{item.name}"
+            f" -- {item.price:.2f} {currency}"
+            f"{' (new product)' if item.is_new else ''}"
+            for item in items
+        )
 
         lines.append(f"\n**Total: {total:.2f} {currency}**")
 
         if confidence_notes:
             lines.append("\n_Notes:_")
-            for note in confidence_notes:
-                lines.append(f"- _{note}_")
+            lines.extend(f"- _{note}_" for note in confidence_notes)
 
         lines.append(f"\nReceipt ID: `{receipt_id[:8]}...`")
         lines.append("If anything looks wrong, just tell me what to correct!")
 
         return "\n".join(lines)
+
+
+# Process-wide parser shared by the handlers, so its services are built once
+receipt_parser = ReceiptParser()
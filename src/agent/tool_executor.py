@@ -1,42 +1,160 @@
 """Tool executor: dispatches tool calls from the LLM to the appropriate service functions."""
 
+import asyncio
 import logging
+from collections.abc import Coroutine, Mapping
+from dataclasses import dataclass, field
+from functools import cached_property
 from typing import Any
 
+import orjson
+
+from src.agent.tools import TOOL_DEFINITIONS
+from src.cache import TTLCache
+from src.config import settings
 from src.db.models import User
 from src.services.analytics import AnalyticsService
 from src.services.discount import DiscountService
 from src.services.purchase import PurchaseService
 from src.services.shopping_list import ShoppingListService
+from src.services.text_to_sql import TextToSQLService
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True, slots=True)
+class _ToolRoute:
+    """The service method a tool dispatches to and how its arguments map."""
+
+    service: str
+    method: str
+    # Tool argument name -> service parameter name, where they differ
+    renames: Mapping[str, str] = field(default_factory=dict)
+    # Whether the service method is scoped to the calling user
+    user_scoped: bool = True
+    # Read-only tool whose results may be served from the result cache
+    cached: bool = False
+    # Tool that changes stored data (runs in order and clears the result cache)
+    writes: bool = False
+
+
+# How long a read-only tool result is reused for an identical call
+TOOL_CACHE_TTL_SECONDS = 60
+
+# Tool name -> service route. Arguments are passed through by name.
+_TOOL_ROUTES: dict[str, _ToolRoute] = {
+    # Data retrieval
+    "search_purchases": _ToolRoute("purchase_service", "search_purchases", cached=True),
+    "get_spending_summary": _ToolRoute(
+        "analytics_service", "get_spending_summary", cached=True
+    ),
+    "get_frequent_purchases": _ToolRoute(
+        "analytics_service", "get_frequent_purchases", cached=True
+    ),
+    "compare_prices": _ToolRoute("analytics_service", "compare_prices", cached=True),
+    "get_product_history": _ToolRoute(
+        "purchase_service", "get_product_history", cached=True
+    ),
+    "get_active_discounts": _ToolRoute(
+        "discount_service", "get_active_discounts", user_scoped=False, cached=True
+    ),
+    # Data entry
+    "add_manual_purchase": _ToolRoute(
+        "purchase_service",
+        "add_manual_purchase",
+        renames={
+            "store": "store_name",
+            "date": "purchase_date",
+            "total": "total_amount",
+        },
+        writes=True,
+    ),
+    "register_discount": _ToolRoute(
+        "discount_service",
+        "register_discount",
+        renames={"store": "store_name", "product": "product_name"},
+        user_scoped=False,
+        writes=True,
+    ),
+    # Shopping lists
+    "create_shopping_list": _ToolRoute(
+        "shopping_list_service", "create_list", writes=True
+    ),
+    "update_shopping_list": _ToolRoute(
+        "shopping_list_service", "update_list", writes=True
+    ),
+    "get_shopping_lists": _ToolRoute("shopping_list_service", "get_lists"),
+    "suggest_shopping_list": _ToolRoute("shopping_list_service", "suggest_list"),
+    # Advanced analytics
+    "run_analytics_query": _ToolRoute("text_to_sql_service", "execute_query"),
+}
+
+# Names of every tool the executor can dispatch
+TOOL_NAMES: frozenset[str] = frozenset(_TOOL_ROUTES)
+
+# Tool name -> (required, accepted) argument names, read from the schemas once
+_TOOL_ARGUMENTS: dict[str, tuple[frozenset[str], frozenset[str]]] = {
+    tool["function"]["name"]: (
+        frozenset(tool["function"]["parameters"].get("required", ())),
+        frozenset(tool["function"]["parameters"].get("properties", {})),
+    )
+    for tool in TOOL_DEFINITIONS
+}
+
+
+def is_read_only_tool(tool_name: str) -> bool:
+    """Return whether a tool only reads data, so it can run alongside others."""
+    route = _TOOL_ROUTES.get(tool_name)
+    return route is not None and not route.writes
+
+
+def _describe_bad_arguments(tool_name: str, provided: set[str]) -> str:
+    """Explain which arguments of a tool call do not match its schema."""
+    required, accepted = _TOOL_ARGUMENTS[tool_name]
+    problems = []
+    if missing := required - provided:
+        problems.append(f"missing required arguments: {', '.join(sorted(missing))}")
+    if unexpected := provided - accepted:
+        problems.append(f"unexpected arguments: {', '.join(sorted(unexpected))}")
+    return f"Invalid arguments for {tool_name}: {'; '.join(problems)}"
+
+
 class ToolExecutor:
     """Executes tool calls by dispatching to the appropriate service layer."""
 
     def __init__(self) -> None:
-        self.purchase_service = PurchaseService()
-        self.analytics_service = AnalyticsService()
-        self.shopping_list_service = ShoppingListService()
-        self.discount_service = DiscountService()
-
-        # Map tool names to handler methods
-        self._handlers: dict[str, Any] = {
-            "search_purchases": self._search_purchases,
-            "get_spending_summary": self._get_spending_summary,
-            "get_frequent_purchases": self._get_frequent_purchases,
-            "compare_prices": self._compare_prices,
-            "get_product_history": self._get_product_history,
-            "get_active_discounts": self._get_active_discounts,
-            "add_manual_purchase": self._add_manual_purchase,
-            "register_discount": self._register_discount,
-            "create_shopping_list": self._create_shopping_list,
-            "update_shopping_list": self._update_shopping_list,
-            "get_shopping_lists": self._get_shopping_lists,
-            "suggest_shopping_list": self._suggest_shopping_list,
-            "run_analytics_query": self._run_analytics_query,
-        }
+        # Results of cached tools keyed by (tool name, serialized service kwargs)
+        self._result_cache: TTLCache | None = (
+            TTLCache(settings.tool_cache_size, TOOL_CACHE_TTL_SECONDS)
+            if settings.tool_cache_enabled
+            else None
+        )
+        # Cached-tool calls currently running, shared by identical requests
+        self._in_flight: dict[tuple[str, bytes], asyncio.Future[Any]] = {}
+
+    # -------------------------------------------------------------------------
+    # SERVICES (built on first use, so unused tools cost nothing)
+    # -------------------------------------------------------------------------
+
+    @cached_property
+    def purchase_service(self) -> PurchaseService:
+        return PurchaseService()
+
+    @cached_property
+    def analytics_service(self) -> AnalyticsService:
+        return AnalyticsService()
+
+    @cached_property
+    def shopping_list_service(self) -> ShoppingListService:
+        return ShoppingListService()
+
+    @cached_property
+    def discount_service(self) -> DiscountService:
+        return DiscountService()
+
+    @cached_property
+    def text_to_sql_service(self) -> TextToSQLService:
+        return TextToSQLService()
 
     async def execute(
         self,
@@ -46,6 +164,10 @@ class ToolExecutor:
     ) -> Any:
         """Execute a tool call and return the result.
 
+        Arguments the LLM sent as null are dropped so the service defaults
+        apply. Read-only tools are served from a short-lived result cache when
+        enabled.
+
         Args:
             tool_name: Name of the tool to execute.
             arguments: Arguments passed by the LLM.
@@ -55,213 +177,77 @@ class ToolExecutor:
             The tool result (will be serialized to JSON for the LLM).
 
         Raises:
-            ValueError: If the tool name is not recognized.
+            ValueError: If the tool name is not recognized, or required
+                arguments are missing or unknown ones are present.
         """
-        handler = self._handlers.get(tool_name)
-        if handler is None:
-            raise ValueError(f"Unknown tool: {tool_name}")
-
-        return await handler(user=user, **arguments)
-
-    # -------------------------------------------------------------------------
-    # DATA RETRIEVAL
-    # -------------------------------------------------------------------------
-
-    async def _search_purchases(
-        self,
-        user: User,
-        query: str | None = None,
-        store: str | None = None,
-        category: str | None = None,
-        start_date: str | None = None,
-        end_date: str | None = None,
-        limit: int = 20,
-    ) -> dict[str, Any]:
-        return await self.purchase_service.search_purchases(
-            user_id=user.id,
-            query=query,
-            store=store,
-            category=category,
-            start_date=start_date,
-            end_date=end_date,
-            limit=limit,
-        )
-
-    async def _get_spending_summary(
-        self,
-        user: User,
-        period: str | None = None,
-        group_by: str | None = None,
-        store: str | None = None,
-        category: str | None = None,
-        start_date: str | None = None,
-        end_date: str | None = None,
-    ) -> dict[str, Any]:
-        return await self.analytics_service.get_spending_summary(
-            user_id=user.id,
-            period=period,
-            group_by=group_by,
-            store=store,
-            category=category,
-            start_date=start_date,
-            end_date=end_date,
-        )
-
-    async def _get_frequent_purchases(
-        self,
-        user: User,
-        period: str | None = None,
-        limit: int = 10,
-    ) -> dict[str, Any]:
-        return await self.analytics_service.get_frequent_purchases(
-            user_id=user.id,
-            period=period,
-            limit=limit,
-        )
-
-    async def _compare_prices(
-        self,
-        user: User,
-        product: str,
-        store: str | None = None,
-        period: str | None = None,
-    ) -> dict[str, Any]:
-        return await self.analytics_service.compare_prices(
-            user_id=user.id,
-            product=product,
-            store=store,
-            period=period,
-        )
-
-    async def _get_product_history(
-        self,
-        user: User,
-        product: str,
-    ) -> dict[str, Any]:
-        return await self.purchase_service.get_product_history(
-            user_id=user.id,
-            product=product,
-        )
-
-    async def _get_active_discounts(
-        self,
-        user: User,
-        store: str | None = None,
-        category: str | None = None,
-    ) -> dict[str, Any]:
-        return await self.discount_service.get_active_discounts(
-            store=store,
-            category=category,
-        )
-
-    # -------------------------------------------------------------------------
-    # DATA ENTRY
-    # -------------------------------------------------------------------------
-
-    async def _add_manual_purchase(
-        self,
-        user: User,
-        store: str,
-        items: list[dict[str, Any]],
-        date: str | None = None,
-        total: float | None = None,
-    ) -> dict[str, Any]:
-        return await self.purchase_service.add_manual_purchase(
-            user_id=user.id,
-            store_name=store,
-            items=items,
-            purchase_date=date,
-            total_amount=total,
-        )
-
-    async def _register_discount(
-        self,
-        user: User,
-        store: str,
-        discount_type: str,
-        value: float,
-        product: str | None = None,
-        description: str | None = None,
-        start_date: str | None = None,
-        end_date: str | None = None,
-    ) -> dict[str, Any]:
-        return await self.discount_service.register_discount(
-            store_name=store,
-            product_name=product,
-            discount_type=discount_type,
-            value=value,
-            description=description,
-            start_date=start_date,
-            end_date=end_date,
-        )
-
-    # -------------------------------------------------------------------------
-    # SHOPPING LISTS
-    # -------------------------------------------------------------------------
-
-    async def _create_shopping_list(
-        self,
-        user: User,
-        name: str,
-        items: list[dict[str, Any]] | None = None,
-    ) -> dict[str, Any]:
-        return await self.shopping_list_service.create_list(
-            user_id=user.id,
-            name=name,
-            items=items or [],
-        )
-
-    async def _update_shopping_list(
-        self,
-        user: User,
-        list_name: str,
-        add_items: list[dict[str, Any]] | None = None,
-        remove_items: list[str] | None = None,
-        check_items: list[str] | None = None,
-    ) -> dict[str, Any]:
-        return await self.shopping_list_service.update_list(
-            user_id=user.id,
-            list_name=list_name,
-            add_items=add_items,
-            remove_items=remove_items,
-            check_items=check_items,
-        )
-
-    async def _get_shopping_lists(
-        self,
-        user: User,
-        active_only: bool = True,
-    ) -> dict[str, Any]:
-        return await self.shopping_list_service.get_lists(
-            user_id=user.id,
-            active_only=active_only,
-        )
-
-    async def _suggest_shopping_list(
-        self,
-        user: User,
-        based_on: str | None = None,
-    ) -> dict[str, Any]:
-        return await self.shopping_list_service.suggest_list(
-            user_id=user.id,
-            based_on=based_on or "weekly_habits",
-        )
-
-    # -------------------------------------------------------------------------
-    # ADVANCED ANALYTICS
-    # -------------------------------------------------------------------------
+        try:
+            route = _TOOL_ROUTES[tool_name]
+        except KeyError:
+            raise ValueError(f"Unknown tool: {tool_name}") from None
+
+        # One dict serves validation and the service call: built once, then
+        # renamed in place for the few tools whose parameter names differ
+        kwargs = {name: value for name, value in arguments.items() if value is not None}
+        required, accepted = _TOOL_ARGUMENTS[tool_name]
+        if not required <= kwargs.keys() <= accepted:
+            raise ValueError(_describe_bad_arguments(tool_name, set(kwargs)))
+
+        for name, service_name in route.renames.items():
+            if name in kwargs:
+                kwargs[service_name] = kwargs.pop(name)
+        if route.user_scoped:
+            kwargs["user_id"] = user.id
+
+        method = getattr(getattr(self, route.service), route.method)
+
+        if route.cached and self._result_cache is not None:
+            key = (tool_name, orjson.dumps(kwargs, option=orjson.OPT_SORT_KEYS))
+            result = self._result_cache.get(key)
+            if result is None:
+                result = await self._call_once(key, method(**kwargs))
+            return result
+
+        result = await method(**kwargs)
+        if route.writes:
+            self.invalidate_cache()
+        return result
+
+    async def _call_once(
+        self, key: tuple[str, bytes], call: Coroutine[Any, Any, Any]
+    ) -> Any:
+        """Run a cached tool call, letting identical concurrent requests share it.
 
-    async def _run_analytics_query(
-        self,
-        user: User,
-        question: str,
-        sql_query: str,
-    ) -> dict[str, Any]:
-        from src.services.text_to_sql import TextToSQLService
-
-        service = TextToSQLService()
-        return await service.execute_query(
-            user_id=user.id,
-            question=question,
-            sql_query=sql_query,
-        )
+        The first caller starts the service call and later callers with the same
+        key await the same result, so a burst of identical requests (e.g. many
+        users asking for the same store's discounts) reaches the database once.
+        """
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(call)
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._complete(key, future))
+        else:
+            call.close()
+        return await asyncio.shield(future)
+
+    def _complete(self, key: tuple[str, bytes], future: asyncio.Future[Any]) -> None:
+        """Move a finished call's result from the in-flight map into the cache."""
+        if self._in_flight.get(key) is not future:
+            return  # invalidated while running; the result may be stale
+        del self._in_flight[key]
+        if (
+            self._result_cache is not None
+            and not future.cancelled()
+            and future.exception() is None
+        ):
+            self._result_cache.set(key, future.result())
+
+    def invalidate_cache(self) -> None:
+        """Drop cached tool results, e.g. after purchases or discounts are stored."""
+        if self._result_cache is not None:
+            self._result_cache.clear()
+        self._in_flight.clear()
+
+
+# Process-wide executor: services and the dispatch map are built once
+tool_executor = ToolExecutor()
@@ -6,6 +6,21 @@ which LiteLLM translates to the appropriate format for each provider.
 
 from typing import Any
 
+# Schema of one shopping list item, shared by the create and update tools
+_SHOPPING_LIST_ITEM_SCHEMA: dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string", "description": "Item name."},
+        "quantity": {"type": "number", "description": "Quantity needed. Default 1."},
+        "unit": {
+            "type": "string",
+            "description": "Unit (e.g., 'kg', 'pcs', 'liters').",
+        },
+        "notes": {"type": "string", "description": "Additional notes for this item."},
+    },
+    "required": ["name"],
+}
+
 TOOL_DEFINITIONS: list[dict[str, Any]] = [
     # -------------------------------------------------------------------------
     # DATA RETRIEVAL TOOLS
@@ -328,28 +343,7 @@ TOOL_DEFINITIONS: list[dict[str, Any]] = [
                     "items": {
                         "type": "array",
                         "description": "Initial items to add.",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "name": {
-                                    "type": "string",
-                                    "description": "Item name.",
-                                },
-                                "quantity": {
-                                    "type": "number",
-                                    "description": "Quantity needed. Default 1.",
-                                },
-                                "unit": {
-                                    "type": "string",
-                                    "description": "Unit (e.g., 'kg', 'pcs', 'liters').",
-                                },
-                                "notes": {
-                                    "type": "string",
-                                    "description": "Additional notes for this item.",
-                                },
-                            },
-                            "required": ["name"],
-                        },
+                        "items": _SHOPPING_LIST_ITEM_SCHEMA,
                     },
                 },
                 "required": ["name"],
@@ -373,16 +367,7 @@ TOOL_DEFINITIONS: list[dict[str, Any]] = [
                     "add_items": {
                         "type": "array",
                         "description": "Items to add to the list.",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "name": {"type": "string"},
-                                "quantity": {"type": "number"},
-                                "unit": {"type": "string"},
-                                "notes": {"type": "string"},
-                            },
-                            "required": ["name"],
-                        },
+                        "items": _SHOPPING_LIST_ITEM_SCHEMA,
                     },
                     "remove_items": {
                         "type": "array",
@@ -1,6 +1,10 @@
 """Handler for inline keyboard callback queries."""
 
+import asyncio
 import logging
+import re
+from collections.abc import Callable, Coroutine
+from typing import Any
 
 from aiogram import F, Router
 from aiogram.types import CallbackQuery
@@ -11,41 +15,69 @@ logger = logging.getLogger(__name__)
 
 router = Router(name="callback")
 
+# Every callback prefix this router handles, matched with one regex per update
+_CALLBACK_RE = re.compile(r"(receipt_confirm|receipt_edit|list_check):")
+
 
-@router.callback_query(F.data.startswith("receipt_confirm:"))
 async def receipt_confirm(callback: CallbackQuery, db_user: User) -> None:
     """Handle receipt confirmation callback."""
     if callback.data is None:
         return
 
-    receipt_id = callback.data.split(":")[1]
-    await callback.answer("Receipt confirmed!")
-    if callback.message:
-        await callback.message.edit_text(  # type: ignore[union-attr]
-            f"Receipt `{receipt_id[:8]}...` has been saved successfully.",
-            parse_mode="Markdown",
-        )
+    _, _, receipt_id = callback.data.partition(":")
+    if callback.message is None:
+        await callback.answer("Receipt confirmed!")
+        return
+
+    # Independent Telegram API calls -- send them concurrently
+    await asyncio.gather(
+        callback.answer("Receipt confirmed!"),
+        callback.message.edit_text(  # type: ignore[union-attr]
+            f"Receipt `{receipt_id[:8]}...` has been saved successfully."
+        ),
+    )
 
 
-@router.callback_query(F.data.startswith("receipt_edit:"))
 async def receipt_edit(callback: CallbackQuery, db_user: User) -> None:
     """Handle receipt edit request callback."""
-    await callback.answer()
-    if callback.message:
-        await callback.message.answer(
+    if callback.message is None:
+        await callback.answer()
+        return
+
+    await asyncio.gather(
+        callback.answer(),
+        callback.message.answer(
             "Please tell me what needs to be corrected. For example:\n"
             "'The total should be 45.30' or 'Remove the second item'."
-        )
+        ),
+    )
 
 
-@router.callback_query(F.data.startswith("list_check:"))
 async def list_item_check(callback: CallbackQuery, db_user: User) -> None:
     """Handle checking/unchecking a shopping list item."""
     if callback.data is None:
         return
 
-    item_id = callback.data.split(":")[1]
+    _, _, item_id = callback.data.partition(":")
     await callback.answer("Item toggled!")
     logger.info(
         "Shopping list item %s toggled by user %s", item_id, db_user.telegram_id
     )
+
+
+# Callback prefix -> handler
+_CALLBACK_HANDLERS: dict[
+    str, Callable[[CallbackQuery, User], Coroutine[Any, Any, None]]
+] = {
+    "receipt_confirm": receipt_confirm,
+    "receipt_edit": receipt_edit,
+    "list_check": list_item_check,
+}
+
+
+@router.callback_query(F.data.regexp(_CALLBACK_RE).as_("match"))
+async def handle_callback(
+    callback: CallbackQuery, db_user: User, match: re.Match[str]
+) -> None:
+    """Dispatch a callback query to the handler for its prefix."""
+    await _CALLBACK_HANDLERS[match.group(1)](callback, db_user)
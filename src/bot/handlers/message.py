@@ -5,7 +5,7 @@ import logging
 from aiogram import F, Router
 from aiogram.types import Message
 
-from src.agent.core import AgentCore
+from src.agent.core import agent_core
 from src.db.models import User
 
 logger = logging.getLogger(__name__)
@@ -23,12 +23,11 @@ async def handle_text_message(message: Message, db_user: User) -> None:
     await message.chat.do("typing")
 
     try:
-        agent = AgentCore()
-        response = await agent.process_message(
+        response = await agent_core.process_message(
             user=db_user,
             message_text=message.text,
         )
-        await message.answer(response, parse_mode="Markdown")
+        await message.answer(response)
     except Exception:
         logger.exception("Error processing message from user %d", db_user.telegram_id)
         await message.answer(
@@ -1,11 +1,12 @@
 """Handler for photo messages -- triggers receipt parsing."""
 
 import logging
+from io import BytesIO
 
 from aiogram import F, Router
 from aiogram.types import Message
 
-from src.agent.receipt_parser import ReceiptParser
+from src.agent.receipt_parser import receipt_parser
 from src.db.models import User
 
 logger = logging.getLogger(__name__)
@@ -31,21 +32,18 @@ async def handle_photo(message: Message, db_user: User) -> None:
             await message.answer("Could not download the photo. Please try again.")
             return
 
-        # Download the photo bytes
-        from io import BytesIO
-
+        # Download the photo bytes. getvalue() hands back the buffer's bytes
+        # without copying them, so no rewind-and-read is needed.
         photo_bytes = BytesIO()
-        await message.bot.download_file(file.file_path, photo_bytes)  # type: ignore[union-attr]
-        photo_bytes.seek(0)
+        await message.bot.download_file(file.file_path, photo_bytes, seek=False)  # type: ignore[union-attr]
 
         # Parse the receipt
-        parser = ReceiptParser()
-        result = await parser.parse_and_store(
+        result = await receipt_parser.parse_and_store(
             user=db_user,
-            image_data=photo_bytes.read(),
+            image_data=photo_bytes.getvalue(),
         )
 
-        await message.answer(result, parse_mode="Markdown")
+        await message.answer(result)
 
     except Exception:
         logger.exception("Error processing receipt from user %d", db_user.telegram_id)
@@ -49,7 +49,7 @@ async def cmd_start(message: Message, db_user: User) -> None:
     await message.answer(f"Hi {name}! {WELCOME_MESSAGE}")
 
 
-@router.message(Command("help"))
+@router.message(Command("help"), flags={"skip_auth": True})
 async def cmd_help(message: Message) -> None:
     """Handle the /help command."""
-    await message.answer(HELP_MESSAGE, parse_mode="Markdown")
+    await message.answer(HELP_MESSAGE)
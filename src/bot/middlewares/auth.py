@@ -1,21 +1,42 @@
 """Authentication middleware: ensures every Telegram user is registered in the database."""
 
+import asyncio
 import logging
 from collections.abc import Awaitable, Callable
 from typing import Any
 
 from aiogram import BaseMiddleware
-from aiogram.types import TelegramObject, Update
-from sqlalchemy import select
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import CallbackQuery, Message, TelegramObject
+from aiogram.types import User as TelegramUser
+from sqlalchemy import bindparam, select
 
+from src.cache import TTLCache
 from src.db.models import User
-from src.db.session import async_session
+from src.db.session import async_session, readonly_session
 
 logger = logging.getLogger(__name__)
 
+# How long a registered user is served from memory before it is re-read
+USER_CACHE_TTL_SECONDS = 300
+
+# Upper bound on the number of users kept in memory
+USER_CACHE_SIZE = 10_000
+
+# Lookup by Telegram id, built once so every call reuses the same statement
+_USER_BY_TELEGRAM_ID = select(User).where(User.telegram_id == bindparam("telegram_id"))
+
 
 class AuthMiddleware(BaseMiddleware):
-    """Middleware that auto-registers Telegram users and injects the DB user into handler data."""
+    """Middleware that auto-registers Telegram users and injects the DB user into handler data.
+
+    Registered as an inner middleware, so it only runs once a handler's
+    filters have matched.
+    """
+
+    def __init__(self) -> None:
+        self._cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL_SECONDS)
+        self._in_flight: dict[int, asyncio.Future[User]] = {}
 
     async def __call__(
         self,
@@ -23,23 +44,78 @@ class AuthMiddleware(BaseMiddleware):
         event: TelegramObject,
         data: dict[str, Any],
     ) -> Any:
-        # Extract the Telegram user from the update
+        # Handlers that never touch the database opt out with flags={"skip_auth": True}
+        if get_flag(data, "skip_auth"):
+            return await handler(event, data)
+
+        # Extract the Telegram user from the message or callback query
         tg_user = None
-        if isinstance(event, Update):
-            if event.message and event.message.from_user:
-                tg_user = event.message.from_user
-            elif event.callback_query and event.callback_query.from_user:
-                tg_user = event.callback_query.from_user
+        if isinstance(event, Message | CallbackQuery):
+            tg_user = event.from_user
 
         if tg_user is None:
             return await handler(event, data)
 
-        # Look up or create the user in the database
-        async with async_session() as session:
-            stmt = select(User).where(User.telegram_id == tg_user.id)
-            result = await session.execute(stmt)
+        # Serve recently seen users from memory unless their profile changed
+        db_user = self._cache.get(tg_user.id)
+        if (
+            db_user is None
+            or db_user.username != tg_user.username
+            or db_user.first_name != tg_user.first_name
+        ):
+            db_user = await self._load_once(tg_user)
+
+        data["db_user"] = db_user
+        return await handler(event, data)
+
+    async def _load_once(self, tg_user: TelegramUser) -> User:
+        """Load a user, letting concurrent updates from the same user share it.
+
+        The first update starts the database lookup and later ones await the
+        same result, so a burst of button presses opens a single session.
+        """
+        future = self._in_flight.get(tg_user.id)
+        if future is None:
+            future = asyncio.ensure_future(self._load_user(tg_user))
+            self._in_flight[tg_user.id] = future
+            future.add_done_callback(lambda _: self._complete(tg_user.id, future))
+        return await asyncio.shield(future)
+
+    def _complete(self, telegram_id: int, future: asyncio.Future[User]) -> None:
+        """Move a finished lookup from the in-flight map into the cache."""
+        del self._in_flight[telegram_id]
+        if not future.cancelled() and future.exception() is None:
+            self._cache.set(telegram_id, future.result())
+
+    async def _load_user(self, tg_user: TelegramUser) -> User:
+        """Look up the user, only opening a write session to create or update it.
+
+        Sessions are closed before returning, so the user comes back detached
+        and can be shared between updates.
+        """
+        async with readonly_session() as session:
+            result = await session.execute(
+                _USER_BY_TELEGRAM_ID, {"telegram_id": tg_user.id}
+            )
             db_user = result.scalar_one_or_none()
 
+        if (
+            db_user is not None
+            and db_user.username == tg_user.username
+            and db_user.first_name == tg_user.first_name
+        ):
+            return db_user
+
+        return await self._upsert_user(tg_user, db_user)
+
+    async def _upsert_user(self, tg_user: TelegramUser, db_user: User | None) -> User:
+        """Register a new user, or store a changed username/first_name.
+
+        The transaction commits when the block exits; server defaults come
+        back through INSERT ... RETURNING, so no refresh is needed.
+        """
+        is_new = db_user is None
+        async with async_session() as session, session.begin():
             if db_user is None:
                 db_user = User(
                     telegram_id=tg_user.id,
@@ -47,23 +123,14 @@ class AuthMiddleware(BaseMiddleware):
                     first_name=tg_user.first_name,
                 )
                 session.add(db_user)
-                await session.commit()
-                await session.refresh(db_user)
-                logger.info(
-                    "New user registered: %s (tg_id=%d)", tg_user.username, tg_user.id
-                )
             else:
-                # Update username/first_name if changed
-                changed = False
-                if db_user.username != tg_user.username:
-                    db_user.username = tg_user.username
-                    changed = True
-                if db_user.first_name != tg_user.first_name:
-                    db_user.first_name = tg_user.first_name
-                    changed = True
-                if changed:
-                    await session.commit()
-
-            data["db_user"] = db_user
+                # Re-attach the detached user; only the changed columns are written
+                session.add(db_user)
+                db_user.username = tg_user.username
+                db_user.first_name = tg_user.first_name
 
-        return await handler(event, data)
+        if is_new:
+            logger.info(
+                "New user registered: %s (tg_id=%d)", tg_user.username, tg_user.id
+            )
+        return db_user
@@ -0,0 +1,63 @@
+"""Outbound request middleware: paces messages to Telegram's bot-wide limit."""
+
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Any
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.methods import EditMessageText, Response, SendMessage
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+    from aiogram.client.session.middlewares.base import NextRequestMiddlewareType
+    from aiogram.methods.base import TelegramMethod
+
+logger = logging.getLogger(__name__)
+
+# Telegram accepts roughly 30 messages per second from one bot across all chats
+MESSAGES_PER_SECOND = 30.0
+
+# Requests that deliver or change a chat message and count towards the limit
+_PACED_METHODS = (SendMessage, EditMessageText)
+
+
+class OutboundThrottleMiddleware(BaseRequestMiddleware):
+    """Bot-wide token bucket for outgoing messages.
+
+    Under a burst, sends wait for a token locally instead of being rejected by
+    Telegram with 429 and retried. Other requests pass through unchanged.
+    """
+
+    def __init__(self) -> None:
+        self._rate = MESSAGES_PER_SECOND
+        self._tokens = MESSAGES_PER_SECOND
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def __call__(
+        self,
+        make_request: "NextRequestMiddlewareType[Any]",
+        bot: "Bot",
+        method: "TelegramMethod[Any]",
+    ) -> Response[Any]:
+        if isinstance(method, _PACED_METHODS):
+            await self._acquire()
+        return await make_request(bot, method)
+
+    async def _acquire(self) -> None:
+        """Take one token, sleeping until it is available.
+
+        Waiters queue on the lock, so messages leave in the order they were sent.
+        """
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self._rate, self._tokens + (now - self._last) * self._rate
+            )
+            self._last = now
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+                self._tokens = 1.0
+                self._last = time.monotonic()
+            self._tokens -= 1
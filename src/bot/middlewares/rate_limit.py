@@ -2,7 +2,7 @@
 
 import logging
 import time
-from collections import defaultdict
+from collections import OrderedDict
 from collections.abc import Awaitable, Callable
 from typing import Any
 
@@ -13,14 +13,26 @@ from src.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on the number of users tracked at once; the least recently seen
+# user is forgotten first, which only resets their bucket to full
+MAX_TRACKED_USERS = 100_000
+
 
 class RateLimitMiddleware(BaseMiddleware):
-    """Per-user rate limiter based on a sliding window of message timestamps."""
+    """Per-user rate limiter based on a token bucket.
+
+    Each user holds up to ``rate_limit_per_minute`` tokens, refilled
+    continuously over a minute. A message spends one token; with none left it
+    is rejected. Only two floats are kept per user.
+    """
 
     def __init__(self) -> None:
-        self._timestamps: dict[int, list[float]] = defaultdict(list)
         self._window_seconds = 60.0
-        self._max_requests = settings.rate_limit_per_minute
+        self._max_requests = float(settings.rate_limit_per_minute)
+        # Tokens regained per second
+        self._rate = self._max_requests / self._window_seconds
+        # user_id -> (tokens, last refill time), least recently seen first
+        self._buckets: OrderedDict[int, tuple[float, float]] = OrderedDict()
 
     async def __call__(
         self,
@@ -33,19 +45,32 @@ class RateLimitMiddleware(BaseMiddleware):
 
         user_id = event.from_user.id
         now = time.monotonic()
-        cutoff = now - self._window_seconds
 
-        # Remove expired timestamps
-        self._timestamps[user_id] = [
-            ts for ts in self._timestamps[user_id] if ts > cutoff
-        ]
+        # Popping and re-inserting keeps the dict ordered by last refill time
+        tokens, last = self._buckets.pop(user_id, (self._max_requests, now))
+        self._evict(now - self._window_seconds)
+        tokens = min(self._max_requests, tokens + (now - last) * self._rate)
 
-        if len(self._timestamps[user_id]) >= self._max_requests:
+        if tokens < 1:
+            self._buckets[user_id] = (tokens, now)
             logger.warning("Rate limit exceeded for user %d", user_id)
             await event.answer(
                 "You're sending messages too fast. Please wait a moment and try again."
             )
             return None
 
-        self._timestamps[user_id].append(now)
+        self._buckets[user_id] = (tokens - 1, now)
         return await handler(event, data)
+
+    def _evict(self, cutoff: float) -> None:
+        """Forget the least recently seen users that are idle or over the cap.
+
+        A user untouched for a whole window has a full bucket again, so
+        dropping them changes nothing. Only the front of the dict is checked.
+        """
+        buckets = self._buckets
+        while buckets and (
+            len(buckets) >= MAX_TRACKED_USERS
+            or next(iter(buckets.values()))[1] <= cutoff
+        ):
+            buckets.popitem(last=False)
@@ -11,9 +11,13 @@ def setup_dispatcher() -> Dispatcher:
     """Create and configure the aiogram Dispatcher with all routers and middlewares."""
     dp = Dispatcher()
 
-    # Register middlewares (applied in order)
-    dp.update.middleware(AuthMiddleware())
+    # Register middlewares (applied in order, after a handler's filters match).
+    # Rate limiting comes first so rejected messages never reach the database;
+    # one AuthMiddleware instance is shared so both event types use its cache.
+    auth = AuthMiddleware()
     dp.message.middleware(RateLimitMiddleware())
+    dp.message.middleware(auth)
+    dp.callback_query.middleware(auth)
 
     # Register handler routers (order matters -- commands first, then general handlers)
     dp.include_router(start.router)
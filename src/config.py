@@ -22,6 +22,10 @@ class Settings(BaseSettings):
     # -- Database --
     database_url: str = "postgresql+asyncpg://localhost:5433/luxtick"
     database_url_readonly: str = "postgresql+asyncpg://localhost:5433/luxtick"
+    db_pool_size: int = 10
+    db_max_overflow: int = 10
+    db_readonly_pool_size: int = 5
+    db_readonly_max_overflow: int = 5
 
     # -- Bot --
     bot_webhook_url: str = ""
@@ -30,6 +34,7 @@ class Settings(BaseSettings):
     # -- Models --
     conversational_model: str = "gpt-4o-mini"
     vision_model: str = "gpt-4o"
+    vision_max_bytes: int = 1_000_000
     item_intelligence_model: str = "gpt-4o-mini"
 
     # -- Feature Flags --
@@ -37,6 +42,16 @@ class Settings(BaseSettings):
 
     # -- Rate Limiting --
     rate_limit_per_minute: int = 20
+    agent_concurrency: int = 32
+    vision_concurrency: int = 4
+    vision_rps: float = 2.0
+
+    # -- Caching --
+    vision_cache_enabled: bool = True
+    vision_cache_size: int = 256
+    tool_cache_enabled: bool = True
+    tool_cache_size: int = 512
+    product_cache_enabled: bool = True
 
     # -- Logging --
     log_level: str = "INFO"
@@ -0,0 +1,69 @@
+"""Bulk write helpers that bypass the ORM unit of work for large inserts."""
+
+from collections.abc import Mapping, Sequence
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.models import ReceiptItem
+
+# Columns written by COPY, in record order
+RECEIPT_ITEM_COPY_COLUMNS = (
+    "id",
+    "receipt_id",
+    "product_id",
+    "name_on_receipt",
+    "quantity",
+    "unit",
+    "unit_price",
+    "total_price",
+    "discount_amount",
+    "discount_type",
+)
+
+# Columns every row must set: COPY applies no ORM-side defaults (e.g.
+# quantity=1), so a missing value would only fail mid-COPY as a NOT NULL error
+_RECEIPT_ITEM_REQUIRED_COLUMNS = frozenset(
+    column.name
+    for column in ReceiptItem.__table__.columns
+    if not column.nullable and column.name in RECEIPT_ITEM_COPY_COLUMNS
+)
+
+
+async def copy_receipt_items(
+    session: AsyncSession, rows: Sequence[Mapping[str, Any]]
+) -> None:
+    """Insert receipt items with PostgreSQL COPY on the session's connection.
+
+    Each row maps column names to values; nullable columns it leaves out are
+    written as NULL. COPY runs inside the session's current transaction, so it
+    is committed or rolled back together with it, and any rows it references
+    (receipt, products) must already be flushed.
+
+    Raises:
+        ValueError: A row has an unknown column or lacks a required value.
+    """
+    if not rows:
+        return
+
+    records = []
+    for row in rows:
+        unknown = row.keys() - set(RECEIPT_ITEM_COPY_COLUMNS)
+        missing = {c for c in _RECEIPT_ITEM_REQUIRED_COLUMNS if row.get(c) is None}
+        if unknown or missing:
+            raise ValueError(
+                f"Invalid receipt item row: unknown={sorted(unknown)}, "
+                f"missing={sorted(missing)}"
+            )
+        records.append(tuple(row.get(column) for column in RECEIPT_ITEM_COPY_COLUMNS))
+
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+    driver_connection = raw_connection.driver_connection
+    assert driver_connection is not None
+
+    await driver_connection.copy_records_to_table(
+        ReceiptItem.__tablename__,
+        records=records,
+        columns=list(RECEIPT_ITEM_COPY_COLUMNS),
+    )
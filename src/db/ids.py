@@ -0,0 +1,23 @@
+"""Primary-key generation helpers."""
+
+import os
+import time
+import uuid
+
+
+def uuid7() -> uuid.UUID:
+    """Return a time-ordered UUID version 7 (RFC 9562).
+
+    The first 48 bits are the Unix time in milliseconds, so ids created one
+    after another land next to each other in B-tree indexes instead of being
+    scattered like random version 4 ids.
+    """
+    timestamp_ms = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10))
+
+    value = (timestamp_ms & 0xFFFF_FFFF_FFFF) << 80
+    value |= 0x7 << 76  # version
+    value |= ((rand >> 62) & 0xFFF) << 64  # 12 random bits (rand_a)
+    value |= 0b10 << 62  # RFC 9562 variant
+    value |= rand & 0x3FFF_FFFF_FFFF_FFFF  # 62 random bits (rand_b)
+    return uuid.UUID(int=value)
@@ -11,6 +11,7 @@ from sqlalchemy import (
     Date,
     DateTime,
     ForeignKey,
+    Index,
     Numeric,
     String,
     Text,
@@ -19,6 +20,8 @@ from sqlalchemy import (
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
+from src.db.ids import uuid7
+
 
 class Base(DeclarativeBase):
     """Base class for all ORM models."""
@@ -30,6 +33,9 @@ class User(Base):
     """A Telegram user who interacts with the bot."""
 
     __tablename__ = "users"
+    # Fetch created_at in the INSERT's RETURNING clause, so a freshly
+    # registered user is complete without a refresh
+    __mapper_args__ = {"eager_defaults": True}
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
@@ -47,10 +53,10 @@ class User(Base):
 
     # Relationships
     receipts: Mapped[list["Receipt"]] = relationship(
-        back_populates="user", lazy="selectin"
+        back_populates="user", lazy="raise"
     )
     shopping_lists: Mapped[list["ShoppingList"]] = relationship(
-        back_populates="user", lazy="selectin"
+        back_populates="user", lazy="raise"
     )
 
 
@@ -58,6 +64,8 @@ class Store(Base):
     """A retail store where purchases are made."""
 
     __tablename__ = "stores"
+    # The pg_trgm index on normalized_name (for ILIKE '%term%' filters) is
+    # created by the migration only, like the one on products.canonical_name.
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
@@ -69,10 +77,10 @@ class Store(Base):
 
     # Relationships
     receipts: Mapped[list["Receipt"]] = relationship(
-        back_populates="store", lazy="selectin"
+        back_populates="store", lazy="raise"
     )
     discounts: Mapped[list["Discount"]] = relationship(
-        back_populates="store", lazy="selectin"
+        back_populates="store", lazy="raise"
     )
 
 
@@ -80,6 +88,8 @@ class Category(Base):
     """A hierarchical product category (e.g., Meat > Poultry > Chicken)."""
 
     __tablename__ = "categories"
+    # The pg_trgm index on name (for ILIKE '%term%' filters) is created by the
+    # migration only, like the one on products.canonical_name.
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
@@ -91,13 +101,13 @@ class Category(Base):
 
     # Relationships
     parent: Mapped["Category | None"] = relationship(
-        back_populates="children", remote_side="Category.id", lazy="selectin"
+        back_populates="children", remote_side="Category.id", lazy="raise"
     )
     children: Mapped[list["Category"]] = relationship(
-        back_populates="parent", lazy="selectin"
+        back_populates="parent", lazy="raise"
     )
     products: Mapped[list["Product"]] = relationship(
-        back_populates="category", lazy="selectin"
+        back_populates="category", lazy="raise"
     )
 
 
@@ -105,6 +115,11 @@ class Product(Base):
     """A canonical product entry with aliases for fuzzy matching."""
 
     __tablename__ = "products"
+    # The pg_trgm index on canonical_name is created by the migration only,
+    # since it depends on the extension being installed.
+    __table_args__ = (
+        Index("ix_products_aliases_gin", "aliases", postgresql_using="gin"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
@@ -119,16 +134,16 @@ class Product(Base):
 
     # Relationships
     category: Mapped["Category | None"] = relationship(
-        back_populates="products", lazy="selectin"
+        back_populates="products", lazy="raise"
     )
     receipt_items: Mapped[list["ReceiptItem"]] = relationship(
-        back_populates="product", lazy="selectin"
+        back_populates="product", lazy="raise"
     )
     discounts: Mapped[list["Discount"]] = relationship(
-        back_populates="product", lazy="selectin"
+        back_populates="product", lazy="raise"
     )
     shopping_list_items: Mapped[list["ShoppingListItem"]] = relationship(
-        back_populates="product", lazy="selectin"
+        back_populates="product", lazy="raise"
     )
 
 
@@ -136,12 +151,21 @@ class Receipt(Base):
     """A purchase event linking a user to a store on a specific date."""
 
     __tablename__ = "receipts"
+    __table_args__ = (
+        # Covering: spending summaries read these columns from the index alone
+        Index(
+            "ix_receipts_user_date",
+            "user_id",
+            "purchase_date",
+            postgresql_include=["total_amount", "id", "store_id"],
+        ),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+        UUID(as_uuid=True), primary_key=True, default=uuid7
     )
     user_id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), ForeignKey("users.id"), index=True
+        UUID(as_uuid=True), ForeignKey("users.id")
     )
     store_id: Mapped[uuid.UUID | None] = mapped_column(
         UUID(as_uuid=True), ForeignKey("stores.id"), index=True
@@ -156,12 +180,12 @@ class Receipt(Base):
     )
 
     # Relationships
-    user: Mapped["User"] = relationship(back_populates="receipts", lazy="selectin")
+    user: Mapped["User"] = relationship(back_populates="receipts", lazy="raise")
     store: Mapped["Store | None"] = relationship(
-        back_populates="receipts", lazy="selectin"
+        back_populates="receipts", lazy="raise"
     )
     items: Mapped[list["ReceiptItem"]] = relationship(
-        back_populates="receipt", lazy="selectin", cascade="all, delete-orphan"
+        back_populates="receipt", lazy="raise", cascade="all, delete-orphan"
     )
 
 
@@ -169,12 +193,15 @@ class ReceiptItem(Base):
     """A single line item on a receipt."""
 
     __tablename__ = "receipt_items"
+    __table_args__ = (
+        Index("ix_receipt_items_receipt_product", "receipt_id", "product_id"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+        UUID(as_uuid=True), primary_key=True, default=uuid7
     )
     receipt_id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), ForeignKey("receipts.id", ondelete="CASCADE"), index=True
+        UUID(as_uuid=True), ForeignKey("receipts.id", ondelete="CASCADE")
     )
     product_id: Mapped[uuid.UUID | None] = mapped_column(
         UUID(as_uuid=True), ForeignKey("products.id"), index=True
@@ -188,9 +215,9 @@ class ReceiptItem(Base):
     discount_type: Mapped[str | None] = mapped_column(String(50))
 
     # Relationships
-    receipt: Mapped["Receipt"] = relationship(back_populates="items", lazy="selectin")
+    receipt: Mapped["Receipt"] = relationship(back_populates="items", lazy="raise")
     product: Mapped["Product | None"] = relationship(
-        back_populates="receipt_items", lazy="selectin"
+        back_populates="receipt_items", lazy="raise"
     )
 
 
@@ -198,18 +225,23 @@ class Discount(Base):
     """A known discount or offer at a store."""
 
     __tablename__ = "discounts"
+    __table_args__ = (
+        Index(
+            "ix_discounts_store_product_start", "store_id", "product_id", "start_date"
+        ),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
     )
     store_id: Mapped[uuid.UUID | None] = mapped_column(
-        UUID(as_uuid=True), ForeignKey("stores.id"), index=True
+        UUID(as_uuid=True), ForeignKey("stores.id")
     )
     product_id: Mapped[uuid.UUID | None] = mapped_column(
         UUID(as_uuid=True), ForeignKey("products.id"), index=True
     )
     category_id: Mapped[uuid.UUID | None] = mapped_column(
-        UUID(as_uuid=True), ForeignKey("categories.id"), index=True
+        UUID(as_uuid=True), ForeignKey("categories.id")
     )
     discount_type: Mapped[str] = mapped_column(
         String(50)
@@ -224,10 +256,10 @@ class Discount(Base):
 
     # Relationships
     store: Mapped["Store | None"] = relationship(
-        back_populates="discounts", lazy="selectin"
+        back_populates="discounts", lazy="raise"
     )
     product: Mapped["Product | None"] = relationship(
-        back_populates="discounts", lazy="selectin"
+        back_populates="discounts", lazy="raise"
     )
 
 
@@ -249,11 +281,9 @@ class ShoppingList(Base):
     )
 
     # Relationships
-    user: Mapped["User"] = relationship(
-        back_populates="shopping_lists", lazy="selectin"
-    )
+    user: Mapped["User"] = relationship(back_populates="shopping_lists", lazy="raise")
     items: Mapped[list["ShoppingListItem"]] = relationship(
-        back_populates="shopping_list", lazy="selectin", cascade="all, delete-orphan"
+        back_populates="shopping_list", lazy="raise", cascade="all, delete-orphan"
     )
 
 
@@ -281,8 +311,8 @@ class ShoppingListItem(Base):
 
     # Relationships
     shopping_list: Mapped["ShoppingList"] = relationship(
-        back_populates="items", lazy="selectin"
+        back_populates="items", lazy="raise"
     )
     product: Mapped["Product | None"] = relationship(
-        back_populates="shopping_list_items", lazy="selectin"
+        back_populates="shopping_list_items", lazy="raise"
     )
@@ -6,20 +6,32 @@ from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_asyn
 
 from src.config import settings
 
+# Pool options shared by both engines: recycle connections before server-side
+# idle timeouts close them, and give up after 5 s instead of queueing forever
+# when every connection is busy
+_POOL_OPTIONS = {"pool_recycle": 1800, "pool_timeout": 5}
+
+# Pool sizes come from settings. A process opens at most the sum of both
+# engines' pool size and overflow (30 by default), so the server's
+# max_connections (100 by default) must cover that for every bot worker and
+# script running at once
+
 # Main engine (full read-write access)
 engine = create_async_engine(
     settings.database_url,
     echo=settings.log_level == "DEBUG",
-    pool_size=5,
-    max_overflow=10,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    **_POOL_OPTIONS,
 )
 
-# Read-only engine for analytics/text-to-SQL queries
+# Read-only engine for user lookups and analytics/text-to-SQL queries
 readonly_engine = create_async_engine(
     settings.database_url_readonly,
     echo=settings.log_level == "DEBUG",
-    pool_size=3,
-    max_overflow=5,
+    pool_size=settings.db_readonly_pool_size,
+    max_overflow=settings.db_readonly_max_overflow,
+    **_POOL_OPTIONS,
 )
 
 # Session factories
@@ -3,13 +3,17 @@
 import asyncio
 import logging
 import sys
+from typing import Any
 
+import orjson
 from aiogram import Bot
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
 from aiogram.enums import ParseMode
 from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 from aiohttp import web
 
+from src.bot.middlewares.outbound import OutboundThrottleMiddleware
 from src.bot.router import setup_dispatcher
 from src.config import settings
 from src.db.session import async_session, close_engines
@@ -23,6 +27,33 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Simultaneous connections to the Bot API; replies to a burst of updates reuse
+# these keep-alive sockets instead of queueing behind aiogram's default of 100
+TELEGRAM_CONNECTION_LIMIT = 200
+
+
+def _json_dumps(value: Any) -> str:
+    """orjson-backed serializer with the str return type aiogram expects."""
+    return orjson.dumps(value).decode()
+
+
+def create_bot() -> Bot:
+    """Build the Bot used by both run modes, with its pooled HTTP session.
+
+    The session's orjson codecs also decode incoming webhook updates.
+    """
+    session = AiohttpSession(
+        limit=TELEGRAM_CONNECTION_LIMIT,
+        json_loads=orjson.loads,
+        json_dumps=_json_dumps,
+    )
+    session.middleware(OutboundThrottleMiddleware())
+    return Bot(
+        token=settings.telegram_bot_token,
+        session=session,
+        default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN),
+    )
+
 
 async def on_startup(bot: Bot) -> None:
     """Called when the bot starts up."""
@@ -53,10 +84,7 @@ async def on_shutdown(bot: Bot) -> None:
 
 async def run_polling() -> None:
     """Run the bot in long-polling mode (development)."""
-    bot = Bot(
-        token=settings.telegram_bot_token,
-        default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN),
-    )
+    bot = create_bot()
     dp = setup_dispatcher()
     dp.startup.register(on_startup)
     dp.shutdown.register(on_shutdown)
@@ -67,10 +95,7 @@ async def run_polling() -> None:
 
 def run_webhook() -> None:
     """Run the bot in webhook mode (production)."""
-    bot = Bot(
-        token=settings.telegram_bot_token,
-        default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN),
-    )
+    bot = create_bot()
     dp = setup_dispatcher()
     dp.startup.register(on_startup)
     dp.shutdown.register(on_shutdown)
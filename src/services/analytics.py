@@ -2,13 +2,15 @@
 
 import logging
 import uuid
-from datetime import date, timedelta
+from datetime import date
 from typing import Any
 
-from sqlalchemy import and_, func, select
+from sqlalchemy import JSON, Date, Float, Select, String, and_, cast, func, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 
 from src.db.models import Category, Product, Receipt, ReceiptItem, Store
 from src.db.session import async_session
+from src.services.periods import PERIOD_RANGES
 from src.services.product import ProductResolver
 
 logger = logging.getLogger(__name__)
@@ -26,29 +28,55 @@ def _resolve_date_range(
             date.fromisoformat(end_date) if end_date else None,
         )
 
-    today = date.today()
-    if period == "today":
-        return today, today
-    elif period == "this_week":
-        start = today - timedelta(days=today.weekday())
-        return start, today
-    elif period == "this_month":
-        return today.replace(day=1), today
-    elif period == "last_month":
-        first_of_this_month = today.replace(day=1)
-        last_of_prev = first_of_this_month - timedelta(days=1)
-        return last_of_prev.replace(day=1), last_of_prev
-    elif period == "this_year":
-        return today.replace(month=1, day=1), today
-    elif period == "last_3_months":
-        return today - timedelta(days=90), today
-    elif period == "last_year":
-        return today - timedelta(days=365), today
-    elif period == "all_time":
+    if period == "all_time":
         return None, None
 
     # Default: this month
-    return today.replace(day=1), today
+    resolve = PERIOD_RANGES.get(period or "", PERIOD_RANGES["this_month"])
+    return resolve(date.today())
+
+
+def _filter_store(
+    stmt: Select[*tuple[Any, ...]], store: str | None
+) -> Select[*tuple[Any, ...]]:
+    """Join Store and filter by its name, only when a store was asked for.
+
+    Joined from receipts; an inner join is equivalent here because rows
+    without a store can never match the name filter.
+    """
+    if not store:
+        return stmt
+    return stmt.join(Store, Receipt.store_id == Store.id).where(
+        Store.normalized_name.ilike(f"%{store.strip().lower()}%")
+    )
+
+
+def _average(total: Any, count: Any) -> Any:
+    """Total / count rounded to cents, 0 when there is nothing to divide."""
+    return func.coalesce(func.round(total / func.nullif(count, 0), 2), 0).label(
+        "avg_per_receipt"
+    )
+
+
+def _as_float(expr: Any) -> Any:
+    """NUMERIC aggregate as double precision, so rows carry plain floats."""
+    return cast(expr, Float)
+
+
+def _json_rows(
+    stmt: Select[*tuple[Any, ...]], order_by: str, descending: bool = False
+) -> Any:
+    """Scalar subquery aggregating stmt's rows into a JSON array of objects.
+
+    Keys are the statement's column labels. The array is sorted by the
+    order_by column inside json_agg itself, since the order of a subquery's
+    rows is not guaranteed to survive the aggregate.
+    """
+    rows = stmt.subquery("rows")
+    key = rows.c[order_by].desc() if descending else rows.c[order_by]
+    return select(
+        func.json_agg(aggregate_order_by(rows.table_valued(), key), type_=JSON)
+    ).scalar_subquery()
 
 
 class AnalyticsService:
@@ -71,59 +99,73 @@ class AnalyticsService:
         d_start, d_end = _resolve_date_range(period, start_date, end_date)
 
         async with async_session() as session:
-            # Base query: total spending
+            # Base query: total spending. Store is only joined when filtering
+            # by it (see _filter_store).
             base_filters = [Receipt.user_id == user_id]
             if d_start:
                 base_filters.append(Receipt.purchase_date >= d_start)
             if d_end:
                 base_filters.append(Receipt.purchase_date <= d_end)
-            if store:
-                base_filters.append(
-                    Store.normalized_name.ilike(f"%{store.strip().lower()}%")
-                )
 
             # Total spending
             if category:
                 total_stmt = (
                     select(
-                        func.sum(ReceiptItem.total_price).label("total"),
+                        func.coalesce(func.sum(ReceiptItem.total_price), 0).label(
+                            "total"
+                        ),
                         func.count(func.distinct(Receipt.id)).label("receipt_count"),
+                        _average(
+                            func.sum(ReceiptItem.total_price),
+                            func.count(func.distinct(Receipt.id)),
+                        ),
                     )
                     .join(Receipt, ReceiptItem.receipt_id == Receipt.id)
-                    .join(Store, Receipt.store_id == Store.id, isouter=True)
-                    .join(Product, ReceiptItem.product_id == Product.id, isouter=True)
-                    .join(Category, Product.category_id == Category.id, isouter=True)
+                    .join(Product, ReceiptItem.product_id == Product.id)
+                    .join(Category, Product.category_id == Category.id)
                     .where(and_(*base_filters))
                     .where(Category.name.ilike(f"%{category.strip()}%"))
                 )
             else:
-                total_stmt = (
-                    select(
-                        func.sum(Receipt.total_amount).label("total"),
-                        func.count(Receipt.id).label("receipt_count"),
-                    )
-                    .join(Store, Receipt.store_id == Store.id, isouter=True)
-                    .where(and_(*base_filters))
-                )
-            total_result = await session.execute(total_stmt)
-            total_row = total_result.one()
-            total_amount = float(total_row.total or 0)
-            receipt_count = int(total_row.receipt_count or 0)
-
-            # Breakdown by group
-            breakdown: list[dict[str, Any]] = []
+                total_stmt = select(
+                    func.coalesce(func.sum(Receipt.total_amount), 0).label("total"),
+                    func.count(Receipt.id).label("receipt_count"),
+                    _average(func.sum(Receipt.total_amount), func.count(Receipt.id)),
+                ).where(and_(*base_filters))
+
+            # Breakdown by group, fetched in the same round trip as the total
+            # as a JSON array of its rows
+            breakdown_stmt: Select[*tuple[Any, ...]] | None = None
             if group_by == "store":
-                breakdown = await self._group_by_store(session, base_filters)
+                breakdown_stmt = self._group_by_store(base_filters, store)
             elif group_by == "category":
-                breakdown = await self._group_by_category(
-                    session, base_filters, user_id, d_start, d_end
+                breakdown_stmt = self._group_by_category(
+                    base_filters, user_id, d_start, d_end
                 )
             elif group_by == "product":
-                breakdown = await self._group_by_product(
-                    session, user_id, d_start, d_end, store, category
+                breakdown_stmt = self._group_by_product(
+                    user_id, d_start, d_end, store, category
                 )
             elif group_by in ("day", "week", "month"):
-                breakdown = await self._group_by_time(session, base_filters, group_by)
+                breakdown_stmt = self._group_by_time(base_filters, store, group_by)
+            if breakdown_stmt is not None:
+                # Periods ascend; every other breakdown leads with its top total
+                order_by, descending = (
+                    ("period", False)
+                    if group_by in ("day", "week", "month")
+                    else ("total", True)
+                )
+                total_stmt = total_stmt.add_columns(
+                    _json_rows(breakdown_stmt, order_by, descending).label("breakdown")
+                )
+
+            total_result = await session.execute(_filter_store(total_stmt, store))
+            total_row = total_result.one()
+            total_amount = float(total_row.total)
+            receipt_count = total_row.receipt_count
+            breakdown: list[dict[str, Any]] = (
+                total_row.breakdown or [] if breakdown_stmt is not None else []
+            )
 
             period_desc = period or "custom range"
             if d_start and d_end:
@@ -133,21 +175,19 @@ class AnalyticsService:
                 "period": period_desc,
                 "total_spent": total_amount,
                 "receipt_count": receipt_count,
-                "average_per_receipt": round(total_amount / receipt_count, 2)
-                if receipt_count
-                else 0,
+                "average_per_receipt": float(total_row.avg_per_receipt),
                 "breakdown": breakdown,
             }
 
-    async def _group_by_store(
+    def _group_by_store(
         self,
-        session: Any,
         base_filters: list[Any],
-    ) -> list[dict[str, Any]]:
+        store: str | None,
+    ) -> Select[*tuple[Any, ...]]:
         stmt = (
             select(
-                Store.name,
-                func.sum(Receipt.total_amount).label("total"),
+                func.coalesce(Store.name, "Unknown").label("name"),
+                _as_float(func.sum(Receipt.total_amount)).label("total"),
                 func.count(Receipt.id).label("visits"),
             )
             .join(Store, Receipt.store_id == Store.id, isouter=True)
@@ -155,35 +195,28 @@ class AnalyticsService:
             .group_by(Store.name)
             .order_by(func.sum(Receipt.total_amount).desc())
         )
-        result = await session.execute(stmt)
-        return [
-            {
-                "name": row.name or "Unknown",
-                "total": float(row.total),
-                "visits": int(row.visits),
-            }
-            for row in result.all()
-        ]
+        if store:
+            stmt = stmt.where(Store.normalized_name.ilike(f"%{store.strip().lower()}%"))
+        return stmt
 
-    async def _group_by_category(
+    def _group_by_category(
         self,
-        session: Any,
         base_filters: list[Any],
         user_id: uuid.UUID,
         d_start: date | None,
         d_end: date | None,
-    ) -> list[dict[str, Any]]:
+    ) -> Select[*tuple[Any, ...]]:
         filters = [Receipt.user_id == user_id]
         if d_start:
             filters.append(Receipt.purchase_date >= d_start)
         if d_end:
             filters.append(Receipt.purchase_date <= d_end)
 
-        stmt = (
+        return (
             select(
-                func.coalesce(Category.name, "Uncategorized").label("category"),
-                func.sum(ReceiptItem.total_price).label("total"),
-                func.count(ReceiptItem.id).label("item_count"),
+                func.coalesce(Category.name, "Uncategorized").label("name"),
+                _as_float(func.sum(ReceiptItem.total_price)).label("total"),
+                func.count(ReceiptItem.id).label("items"),
             )
             .join(Receipt, ReceiptItem.receipt_id == Receipt.id)
             .join(Product, ReceiptItem.product_id == Product.id, isouter=True)
@@ -192,98 +225,68 @@ class AnalyticsService:
             .group_by(Category.name)
             .order_by(func.sum(ReceiptItem.total_price).desc())
         )
-        result = await session.execute(stmt)
-        return [
-            {
-                "name": row.category,
-                "total": float(row.total),
-                "items": int(row.item_count),
-            }
-            for row in result.all()
-        ]
 
-    async def _group_by_product(
+    def _group_by_product(
         self,
-        session: Any,
         user_id: uuid.UUID,
         d_start: date | None,
         d_end: date | None,
         store: str | None = None,
         category: str | None = None,
-    ) -> list[dict[str, Any]]:
+    ) -> Select[*tuple[Any, ...]]:
         filters = [Receipt.user_id == user_id]
         if d_start:
             filters.append(Receipt.purchase_date >= d_start)
         if d_end:
             filters.append(Receipt.purchase_date <= d_end)
-        if store:
-            filters.append(Store.normalized_name.ilike(f"%{store.strip().lower()}%"))
-        if category:
-            filters.append(Category.name.ilike(f"%{category.strip()}%"))
 
         stmt = (
             select(
                 func.coalesce(
                     Product.canonical_name, ReceiptItem.name_on_receipt
-                ).label("product"),
-                func.sum(ReceiptItem.total_price).label("total"),
-                func.sum(ReceiptItem.quantity).label("total_qty"),
-                func.count(ReceiptItem.id).label("purchase_count"),
+                ).label("name"),
+                _as_float(func.sum(ReceiptItem.total_price)).label("total"),
+                _as_float(func.sum(ReceiptItem.quantity)).label("quantity"),
+                func.count(ReceiptItem.id).label("purchases"),
             )
             .join(Receipt, ReceiptItem.receipt_id == Receipt.id)
-            .join(Store, Receipt.store_id == Store.id, isouter=True)
             .join(Product, ReceiptItem.product_id == Product.id, isouter=True)
-            .join(Category, Product.category_id == Category.id, isouter=True)
             .where(and_(*filters))
             .group_by(Product.canonical_name, ReceiptItem.name_on_receipt)
             .order_by(func.sum(ReceiptItem.total_price).desc())
             .limit(20)
         )
-        result = await session.execute(stmt)
-        return [
-            {
-                "name": row.product,
-                "total": float(row.total),
-                "quantity": float(row.total_qty),
-                "purchases": int(row.purchase_count),
-            }
-            for row in result.all()
-        ]
+        if category:
+            stmt = stmt.join(Category, Product.category_id == Category.id).where(
+                Category.name.ilike(f"%{category.strip()}%")
+            )
+        return _filter_store(stmt, store)
 
-    async def _group_by_time(
+    def _group_by_time(
         self,
-        session: Any,
         base_filters: list[Any],
+        store: str | None,
         granularity: str,
-    ) -> list[dict[str, Any]]:
+    ) -> Select[*tuple[Any, ...]]:
         time_col: Any
         if granularity == "day":
             time_col = Receipt.purchase_date
         elif granularity == "week":
-            time_col = func.date_trunc("week", Receipt.purchase_date)
+            time_col = cast(func.date_trunc("week", Receipt.purchase_date), Date)
         else:  # month
-            time_col = func.date_trunc("month", Receipt.purchase_date)
+            time_col = cast(func.date_trunc("month", Receipt.purchase_date), Date)
 
         stmt = (
             select(
-                time_col.label("period"),
-                func.sum(Receipt.total_amount).label("total"),
-                func.count(Receipt.id).label("receipt_count"),
+                cast(time_col, String).label("period"),
+                _as_float(func.sum(Receipt.total_amount)).label("total"),
+                func.count(Receipt.id).label("receipts"),
             )
-            .join(Store, Receipt.store_id == Store.id, isouter=True)
             .where(and_(*base_filters))
             .group_by(time_col)
             .order_by(time_col)
         )
-        result = await session.execute(stmt)
-        return [
-            {
-                "period": str(row.period),
-                "total": float(row.total),
-                "receipts": int(row.receipt_count),
-            }
-            for row in result.all()
-        ]
+        return _filter_store(stmt, store)
 
     async def get_frequent_purchases(
         self,
@@ -307,9 +310,11 @@ class AnalyticsService:
                         Product.canonical_name, ReceiptItem.name_on_receipt
                     ).label("product"),
                     func.count(ReceiptItem.id).label("times_bought"),
-                    func.sum(ReceiptItem.quantity).label("total_quantity"),
-                    func.sum(ReceiptItem.total_price).label("total_spent"),
-                    func.avg(ReceiptItem.unit_price).label("avg_price"),
+                    _as_float(func.sum(ReceiptItem.quantity)).label("total_quantity"),
+                    _as_float(func.sum(ReceiptItem.total_price)).label("total_spent"),
+                    _as_float(func.round(func.avg(ReceiptItem.unit_price), 2)).label(
+                        "average_price"
+                    ),
                 )
                 .join(Receipt, ReceiptItem.receipt_id == Receipt.id)
                 .join(Product, ReceiptItem.product_id == Product.id, isouter=True)
@@ -319,20 +324,10 @@ class AnalyticsService:
                 .limit(limit)
             )
             result = await session.execute(stmt)
-            rows = result.all()
 
             return {
                 "period": period or "all_time",
-                "frequent_items": [
-                    {
-                        "product": row.product,
-                        "times_bought": int(row.times_bought),
-                        "total_quantity": float(row.total_quantity),
-                        "total_spent": float(row.total_spent),
-                        "average_price": round(float(row.avg_price), 2),
-                    }
-                    for row in rows
-                ],
+                "frequent_items": [dict(row) for row in result.mappings()],
             }
 
     async def compare_prices(
@@ -364,10 +359,12 @@ class AnalyticsService:
 
             stmt = (
                 select(
-                    Store.name.label("store"),
-                    func.avg(ReceiptItem.unit_price).label("avg_price"),
-                    func.min(ReceiptItem.unit_price).label("min_price"),
-                    func.max(ReceiptItem.unit_price).label("max_price"),
+                    func.coalesce(Store.name, "Unknown").label("store"),
+                    _as_float(func.round(func.avg(ReceiptItem.unit_price), 2)).label(
+                        "average_price"
+                    ),
+                    _as_float(func.min(ReceiptItem.unit_price)).label("min_price"),
+                    _as_float(func.max(ReceiptItem.unit_price)).label("max_price"),
                     func.count(ReceiptItem.id).label("purchase_count"),
                 )
                 .join(Receipt, ReceiptItem.receipt_id == Receipt.id)
@@ -377,19 +374,9 @@ class AnalyticsService:
                 .order_by(func.avg(ReceiptItem.unit_price))
             )
             result = await session.execute(stmt)
-            rows = result.all()
 
             return {
                 "product": product,
                 "period": period or "last_3_months",
-                "comparisons": [
-                    {
-                        "store": row.store or "Unknown",
-                        "average_price": round(float(row.avg_price), 2),
-                        "min_price": float(row.min_price),
-                        "max_price": float(row.max_price),
-                        "purchase_count": int(row.purchase_count),
-                    }
-                    for row in rows
-                ],
+                "comparisons": [dict(row) for row in result.mappings()],
             }
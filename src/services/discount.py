@@ -6,7 +6,8 @@ from datetime import date
 from decimal import Decimal
 from typing import Any
 
-from sqlalchemy import or_, select
+from sqlalchemy import func, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from src.db.models import Category, Discount, Product, Store
 from src.db.session import async_session
@@ -27,7 +28,16 @@ class DiscountService:
 
         async with async_session() as session:
             stmt = (
-                select(Discount)
+                select(
+                    Discount.discount_type,
+                    Discount.value,
+                    Discount.description,
+                    Discount.start_date,
+                    Discount.end_date,
+                    Store.name.label("store_name"),
+                    Product.canonical_name.label("product_name"),
+                )
+                .select_from(Discount)
                 .join(Store, Discount.store_id == Store.id, isouter=True)
                 .join(Product, Discount.product_id == Product.id, isouter=True)
                 .join(Category, Discount.category_id == Category.id, isouter=True)
@@ -46,30 +56,27 @@ class DiscountService:
             if category:
                 stmt = stmt.where(Category.name.ilike(f"%{category}%"))
 
+            # Plain rows: the response only needs these columns, so no ORM
+            # instances are built
             stmt = stmt.order_by(Discount.end_date.asc())
-
             result = await session.execute(stmt)
-            discounts = list(result.scalars().all())
-
-            # Reload relationships
-            discount_list = []
-            for d in discounts:
-                await session.refresh(d, ["store", "product"])
-                discount_list.append(
-                    {
-                        "store": d.store.name if d.store else "Any store",
-                        "product": d.product.canonical_name
-                        if d.product
-                        else "Store-wide",
-                        "type": d.discount_type,
-                        "value": float(d.value),
-                        "description": d.description,
-                        "start_date": d.start_date.isoformat()
-                        if d.start_date
-                        else None,
-                        "end_date": d.end_date.isoformat() if d.end_date else None,
-                    }
-                )
+
+            discount_list = [
+                {
+                    "store": row["store_name"] or "Any store",
+                    "product": row["product_name"] or "Store-wide",
+                    "type": row["discount_type"],
+                    "value": float(row["value"]),
+                    "description": row["description"],
+                    "start_date": row["start_date"].isoformat()
+                    if row["start_date"]
+                    else None,
+                    "end_date": row["end_date"].isoformat()
+                    if row["end_date"]
+                    else None,
+                }
+                for row in result.mappings()
+            ]
 
             return {
                 "discounts": discount_list,
@@ -88,35 +95,47 @@ class DiscountService:
     ) -> dict[str, Any]:
         """Register a new discount or offer."""
         async with async_session() as session:
-            # Find or create store
+            # Find or create store in one statement; the no-op update on conflict
+            # makes RETURNING yield the existing row, and concurrent inserts of
+            # the same store cannot race into a unique violation
             normalized = store_name.strip().lower().replace("'", "").replace("'", "")
-            stmt = select(Store).where(Store.normalized_name == normalized)
-            result = await session.execute(stmt)
-            store = result.scalar_one_or_none()
-
-            if store is None:
-                store = Store(
+            store_stmt = (
+                pg_insert(Store)
+                .values(
                     id=uuid.uuid4(),
                     name=store_name.strip().title(),
                     normalized_name=normalized,
                 )
-                session.add(store)
-                await session.flush()
+                .on_conflict_do_update(
+                    index_elements=[Store.normalized_name],
+                    set_={"name": Store.name},
+                )
+                .returning(Store.id, Store.name)
+            )
+            store_id, store_display_name = (await session.execute(store_stmt)).one()
 
-            # Find product if specified
+            # Find product if specified (first match when several are similar)
             product_id = None
             if product_name:
-                product_stmt = select(Product).where(
-                    Product.canonical_name.ilike(f"%{product_name}%")
+                # Several products can contain the name: prefer an exact match,
+                # then the shortest (least specific) name
+                product_id = await session.scalar(
+                    select(Product.id)
+                    .where(Product.canonical_name.ilike(f"%{product_name}%"))
+                    .order_by(
+                        (
+                            func.lower(Product.canonical_name)
+                            == product_name.strip().lower()
+                        ).desc(),
+                        func.length(Product.canonical_name),
+                        Product.canonical_name,
+                    )
+                    .limit(1)
                 )
-                result = await session.execute(product_stmt)
-                product = result.scalar_one_or_none()
-                if product:
-                    product_id = product.id
 
             discount = Discount(
                 id=uuid.uuid4(),
-                store_id=store.id,
+                store_id=store_id,
                 product_id=product_id,
                 discount_type=discount_type,
                 value=Decimal(str(value)),
@@ -138,6 +157,6 @@ class DiscountService:
             return {
                 "status": "success",
                 "discount_id": str(discount.id),
-                "message": f"Registered discount: {value_desc} on {target} at {store.name}"
+                "message": f"Registered discount: {value_desc} on {target} at {store_display_name}"
                 + (f" until {end_date}" if end_date else ""),
             }
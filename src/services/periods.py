@@ -0,0 +1,21 @@
+"""Named reporting periods (this_month, last_year, ...) shared by the services."""
+
+from collections.abc import Callable
+from datetime import date, timedelta
+
+
+def _last_month(today: date) -> tuple[date, date]:
+    last_of_prev = today.replace(day=1) - timedelta(days=1)
+    return last_of_prev.replace(day=1), last_of_prev
+
+
+# Period name -> (start, end) for a given day, both inclusive
+PERIOD_RANGES: dict[str, Callable[[date], tuple[date, date]]] = {
+    "today": lambda today: (today, today),
+    "this_week": lambda today: (today - timedelta(days=today.weekday()), today),
+    "this_month": lambda today: (today.replace(day=1), today),
+    "last_month": _last_month,
+    "this_year": lambda today: (today.replace(month=1, day=1), today),
+    "last_3_months": lambda today: (today - timedelta(days=90), today),
+    "last_year": lambda today: (today - timedelta(days=365), today),
+}
@@ -1,16 +1,23 @@
 """Product matching and canonical product management."""
 
+import asyncio
 import logging
+import time
 import uuid
+from collections.abc import Iterable, Sequence
 from dataclasses import dataclass
 
 from rapidfuzz import fuzz, process
 from rapidfuzz.utils import default_process
-from sqlalchemy import or_, select
+from sqlalchemy import String, cast, event, func, or_, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 
+from src.config import settings
 from src.db.models import Category, Product
-from src.db.session import async_session
+from src.db.session import async_session, readonly_session
 from src.services.category_taxonomy import resolve_or_create_category_path
 from src.services.product_intelligence import ItemIntelligence
 
@@ -19,6 +26,22 @@ logger = logging.getLogger(__name__)
 # Minimum fuzzy match score to auto-link a receipt item to a canonical product
 AUTO_MATCH_THRESHOLD = 80
 
+# Minimum fuzzy match score for resolving a user's query term to a product
+RESOLVE_MATCH_THRESHOLD = 75
+
+# How long the in-process product name index is trusted for lookups that
+# find a match before it is reloaded
+PRODUCT_INDEX_TTL_SECONDS = 300
+
+# A lookup that finds no match is about to create a product, so it first
+# reloads an index older than this. Another process creating the same product
+# within this window can still produce a duplicate.
+PRODUCT_INDEX_MISS_RELOAD_SECONDS = 5
+
+# Session.info key holding (product id, match key) pairs this transaction
+# wrote; they reach the shared index only once the transaction commits
+_PENDING_INDEX_KEY = "pending_product_index"
+
 
 @dataclass(slots=True)
 class ProductResolution:
@@ -28,6 +51,188 @@ class ProductResolution:
     matched_terms: list[str]
 
 
+def _match_key(name: str) -> str:
+    """Normalised name with its words sorted, ready for a plain ratio.
+
+    fuzz.ratio on two such keys equals fuzz.token_sort_ratio on the raw names,
+    so the per-candidate tokenising and sorting is done once, at index time.
+    """
+    return " ".join(sorted(default_process(name).split()))
+
+
+class _ProductIndex:
+    """Match keys of every product's canonical name and aliases, with their ids.
+
+    Loaded with a single column-only query and reused across lookups until it
+    expires, so matching a receipt's items does not re-read the products table
+    for each one. Reloads read through their own read-only session, so only
+    committed rows enter the index. Products created or extended in-process are
+    added once their transaction commits (see _publish_pending).
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self._ttl = ttl
+        self._loaded_at = float("-inf")
+        self._expires_at = 0.0
+        self._names: list[str] = []
+        self._product_ids: list[uuid.UUID] = []
+        self._lock = asyncio.Lock()
+        # Entries added while a reload is in flight; its snapshot may predate them
+        self._added_during_reload: list[tuple[uuid.UUID, str]] | None = None
+
+    def _is_fresh(self, max_age: float | None) -> bool:
+        now = time.monotonic()
+        return now < self._expires_at and (
+            max_age is None or now - self._loaded_at < max_age
+        )
+
+    async def ensure_loaded(self, max_age: float | None = None) -> bool:
+        """Reload from the database if expired or older than max_age seconds.
+
+        Returns whether a reload happened. Concurrent callers share one reload.
+        """
+        if self._is_fresh(max_age):
+            return False
+        async with self._lock:
+            if self._is_fresh(max_age):
+                return False
+            started = time.monotonic()
+            self._added_during_reload = []
+            try:
+                async with readonly_session() as session:
+                    rows = (
+                        await session.execute(
+                            select(Product.id, Product.canonical_name, Product.aliases)
+                        )
+                    ).all()
+                names: list[str] = []
+                product_ids: list[uuid.UUID] = []
+                for product_id, canonical_name, aliases in rows:
+                    for name in [canonical_name, *(aliases or [])]:
+                        names.append(_match_key(name))
+                        product_ids.append(product_id)
+                for product_id, key in self._added_during_reload:
+                    names.append(key)
+                    product_ids.append(product_id)
+            finally:
+                self._added_during_reload = None
+            self._names = names
+            self._product_ids = product_ids
+            self._loaded_at = started
+            self._expires_at = started + self._ttl
+            return True
+
+    def add(self, product_id: uuid.UUID, names: Iterable[str]) -> None:
+        """Index extra, committed names for a product."""
+        self.extend((product_id, _match_key(name)) for name in names)
+
+    def extend(self, entries: Iterable[tuple[uuid.UUID, str]]) -> None:
+        """Index (product id, match key) pairs."""
+        for product_id, key in entries:
+            self._names.append(key)
+            self._product_ids.append(product_id)
+            if self._added_during_reload is not None:
+                self._added_during_reload.append((product_id, key))
+
+    def invalidate(self) -> None:
+        """Force a reload on next use."""
+        self._expires_at = 0.0
+
+    def best_match(
+        self,
+        name: str,
+        score_cutoff: float,
+        pending: Sequence[tuple[uuid.UUID, str]] = (),
+    ) -> tuple[uuid.UUID, float] | None:
+        """Return the id and score of the closest product name, if good enough.
+
+        pending holds entries not yet in the index, e.g. the calling session's
+        uncommitted products; an indexed name wins a tie.
+        """
+        key = _match_key(name)
+        best: tuple[uuid.UUID, float] | None = None
+        match = process.extractOne(
+            key,
+            self._names,
+            scorer=fuzz.ratio,
+            processor=None,
+            score_cutoff=score_cutoff,
+        )
+        if match is not None:
+            best = self._product_ids[match[2]], match[1]
+        if pending:
+            match = process.extractOne(
+                key,
+                [pending_key for _, pending_key in pending],
+                scorer=fuzz.ratio,
+                processor=None,
+                score_cutoff=score_cutoff,
+            )
+            if match is not None and (best is None or match[1] > best[1]):
+                best = pending[match[2]][0], match[1]
+        return best
+
+
+# Process-wide index shared by ProductMatcher and ProductResolver
+_PRODUCT_INDEX = _ProductIndex(
+    PRODUCT_INDEX_TTL_SECONDS if settings.product_cache_enabled else 0
+)
+
+
+def _add_pending(
+    session: AsyncSession, product_id: uuid.UUID, names: Iterable[str]
+) -> None:
+    """Record names written for a product in this session's transaction."""
+    session.info.setdefault(_PENDING_INDEX_KEY, []).extend(
+        (product_id, _match_key(name)) for name in names
+    )
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending(session: Session) -> None:
+    """Move the committed transaction's product names into the shared index."""
+    pending = session.info.pop(_PENDING_INDEX_KEY, None)
+    if pending:
+        _PRODUCT_INDEX.extend(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    """Forget product names whose transaction rolled back."""
+    session.info.pop(_PENDING_INDEX_KEY, None)
+
+
+async def _match_product(
+    session: AsyncSession, name: str, score_cutoff: float
+) -> tuple[Product, float] | None:
+    """Find the closest existing product for name.
+
+    Looks in the shared index and in the products this session has written but
+    not committed. A miss reloads an index older than
+    PRODUCT_INDEX_MISS_RELOAD_SECONDS and retries, so products other processes
+    created since are found instead of duplicated. An id whose row no longer
+    exists means the index is stale; it is reloaded and the lookup retried.
+    """
+    await _PRODUCT_INDEX.ensure_loaded()
+    reloaded = False
+    while True:
+        match = _PRODUCT_INDEX.best_match(
+            name, score_cutoff, session.info.get(_PENDING_INDEX_KEY, ())
+        )
+        if match is not None:
+            product = await session.get(Product, match[0])
+            if product is not None:
+                return product, match[1]
+            _PRODUCT_INDEX.invalidate()
+        if reloaded:
+            return None
+        reloaded = await _PRODUCT_INDEX.ensure_loaded(
+            max_age=PRODUCT_INDEX_MISS_RELOAD_SECONDS
+        )
+        if not reloaded:
+            return None
+
+
 class ProductMatcher:
     """Fuzzy-matches receipt item names to canonical products in the database."""
 
@@ -54,75 +259,62 @@ class ProductMatcher:
         assert session is not None
 
         try:
-            # Load all products for fuzzy matching
-            stmt = select(Product)
-            result = await session.execute(stmt)
-            products: list[Product] = list(result.scalars().all())
-
-            if not products:
-                # No products exist yet -- create a new one
-                product = await self._create_product(
-                    name_on_receipt,
-                    session,
-                    item_intelligence=item_intelligence,
-                )
-                if manage_session:
-                    await session.commit()
-                return product, True
-
-            # Build a list of (name, product) for matching against canonical names + aliases
-            candidates: list[tuple[str, Product]] = []
-            for p in products:
-                candidates.append((p.canonical_name, p))
-                if p.aliases:
-                    for alias in p.aliases:
-                        candidates.append((alias, p))
-
-            candidate_names = [c[0] for c in candidates]
-
             target_name = (
                 item_intelligence.canonical_name_en
                 if item_intelligence and item_intelligence.canonical_name_en
                 else name_on_receipt
             )
 
-            # Fuzzy match (explicit processor for case-insensitive comparison)
-            match = process.extractOne(
-                target_name,
-                candidate_names,
-                scorer=fuzz.token_sort_ratio,
-                processor=default_process,
-            )
+            # Fuzzy match against canonical names + aliases (case-insensitive)
+            match = await _match_product(session, target_name, AUTO_MATCH_THRESHOLD)
 
-            if match and match[1] >= AUTO_MATCH_THRESHOLD:
-                matched_name = match[0]
-                matched_product = next(p for n, p in candidates if n == matched_name)
+            if match is not None:
+                matched_product, score = match
                 logger.info(
                     "Matched '%s' -> '%s' (score: %d)",
                     target_name,
                     matched_product.canonical_name,
-                    match[1],
+                    score,
                 )
 
                 # Add source alias and LLM aliases if they are new.
-                if matched_product.aliases is None:
-                    matched_product.aliases = []
-                existing_aliases = {a.lower() for a in matched_product.aliases}
+                current_aliases = matched_product.aliases or []
+                existing_aliases = {a.lower() for a in current_aliases}
                 candidate_aliases = [name_on_receipt]
                 if item_intelligence:
                     candidate_aliases.extend(item_intelligence.aliases_en)
 
-                added_alias = False
+                new_aliases: list[str] = []
                 for alias in candidate_aliases:
                     cleaned = alias.strip()
                     if (
                         cleaned
                         and cleaned.lower() not in existing_aliases
-                        and len(matched_product.aliases) < 50
+                        and len(current_aliases) + len(new_aliases) < 50
                     ):
-                        matched_product.aliases = [*matched_product.aliases, cleaned]
+                        new_aliases.append(cleaned)
                         existing_aliases.add(cleaned.lower())
-                        added_alias = True
+
+                added_alias = bool(new_aliases)
+                if added_alias:
+                    # Append in the database rather than rewriting the whole
+                    # array, then record the result as the loaded value so the
+                    # instance is not flushed again
+                    await session.execute(
+                        update(Product)
+                        .where(Product.id == matched_product.id)
+                        .values(
+                            aliases=func.array_cat(
+                                Product.aliases,
+                                cast(new_aliases, ARRAY(String(255))),
+                            )
+                        )
+                        .execution_options(synchronize_session=False)
+                    )
+                    set_committed_value(
+                        matched_product, "aliases", [*current_aliases, *new_aliases]
+                    )
+                    _add_pending(session, matched_product.id, new_aliases)
 
                 category_assigned = False
                 if (
@@ -187,6 +379,7 @@ class ProductMatcher:
             category_id=category_id,
         )
         session.add(product)
+        _add_pending(session, product.id, [canonical_name, *deduped_aliases])
         logger.info("Created new product: '%s'", product.canonical_name)
         return product
 
@@ -226,28 +419,11 @@ class ProductResolver:
             )
 
         # Fuzzy fallback over canonical names and aliases.
-        all_stmt = select(Product)
-        all_result = await session.execute(all_stmt)
-        all_products = list(all_result.scalars().all())
-        if not all_products:
-            return ProductResolution(product_ids=[], matched_terms=[])
-
-        candidates: list[tuple[str, Product]] = []
-        for product in all_products:
-            candidates.append((product.canonical_name, product))
-            for alias in product.aliases or []:
-                candidates.append((alias, product))
-
-        match = process.extractOne(
-            cleaned_term,
-            [name for name, _ in candidates],
-            scorer=fuzz.token_sort_ratio,
-            processor=default_process,
-        )
-        if not match or match[1] < 75:
+        match = await _match_product(session, cleaned_term, RESOLVE_MATCH_THRESHOLD)
+        if match is None:
             return ProductResolution(product_ids=[], matched_terms=[])
 
-        best_product = next(p for n, p in candidates if n == match[0])
+        best_product, _ = match
         return ProductResolution(
             product_ids=[best_product.id],
             matched_terms=[best_product.canonical_name],
@@ -1,5 +1,6 @@
 """LLM-powered multilingual item normalization into English product intelligence."""
 
+import asyncio
 import json
 import logging
 from dataclasses import dataclass
@@ -27,6 +28,13 @@ Rules:
 7) Output ONLY valid JSON.
 """
 
+# Names per enrichment call; the response for a full batch must fit in the
+# completion's max_tokens, or the JSON is cut off and the batch falls back
+ENRICH_BATCH_SIZE = 20
+
+# Batches of one enrich_items call that may be in flight at once
+ENRICH_CONCURRENCY = 4
+
 ALLOWED_CATEGORY_PATHS = [
     f"{root} > {child}"
     for root, children in DEFAULT_CATEGORY_TREE.items()
@@ -126,10 +134,17 @@ class ProductIntelligenceService:
     async def enrich_items(
         self, raw_item_names: list[str]
     ) -> dict[str, ItemIntelligence]:
-        """Return item intelligence keyed by original source_name."""
-        cleaned_names = [
-            name.strip() for name in raw_item_names if name and name.strip()
-        ]
+        """Return item intelligence keyed by original source_name.
+
+        Names are sent in batches of ENRICH_BATCH_SIZE, up to
+        ENRICH_CONCURRENCY at a time, so each response fits the completion's
+        token budget.
+        """
+        cleaned_names = list(
+            dict.fromkeys(
+                name.strip() for name in raw_item_names if name and name.strip()
+            )
+        )
         if not cleaned_names:
             return {}
 
@@ -140,6 +155,25 @@ class ProductIntelligenceService:
         ):
             return self._fallback_map(cleaned_names)
 
+        batches = [
+            cleaned_names[i : i + ENRICH_BATCH_SIZE]
+            for i in range(0, len(cleaned_names), ENRICH_BATCH_SIZE)
+        ]
+        semaphore = asyncio.Semaphore(ENRICH_CONCURRENCY)
+
+        async def run(batch: list[str]) -> dict[str, ItemIntelligence]:
+            async with semaphore:
+                return await self._enrich_batch(batch)
+
+        mapped: dict[str, ItemIntelligence] = {}
+        for batch_result in await asyncio.gather(*(run(batch) for batch in batches)):
+            mapped.update(batch_result)
+        return mapped
+
+    async def _enrich_batch(
+        self, cleaned_names: list[str]
+    ) -> dict[str, ItemIntelligence]:
+        """Enrich one batch with a single LLM call, falling back on failure."""
         try:
             response = await litellm.acompletion(
                 model=settings.item_intelligence_model,
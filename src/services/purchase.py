@@ -2,7 +2,7 @@
 
 import logging
 import uuid
-from datetime import date, timedelta
+from datetime import date
 from decimal import Decimal
 from typing import Any
 
@@ -11,8 +11,11 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from src.config import settings
+from src.db.bulk import copy_receipt_items
+from src.db.ids import uuid7
 from src.db.models import Category, Product, Receipt, ReceiptItem, Store
 from src.db.session import async_session
+from src.services.periods import PERIOD_RANGES
 from src.services.product import ProductMatcher, ProductResolver
 from src.services.product_intelligence import ProductIntelligenceService
 
@@ -43,28 +46,10 @@ def _resolve_date_range(
             date.fromisoformat(end_date) if end_date else None,
         )
 
-    today = date.today()
-    if period == "today":
-        return today, today
-    elif period == "this_week":
-        start = today - timedelta(days=today.weekday())
-        return start, today
-    elif period == "this_month":
-        return today.replace(day=1), today
-    elif period == "last_month":
-        first_of_this_month = today.replace(day=1)
-        last_of_prev = first_of_this_month - timedelta(days=1)
-        return last_of_prev.replace(day=1), last_of_prev
-    elif period == "this_year":
-        return today.replace(month=1, day=1), today
-    elif period == "last_3_months":
-        start = today - timedelta(days=90)
-        return start, today
-    elif period == "last_year":
-        start = today - timedelta(days=365)
-        return start, today
-
-    return None, None
+    resolve = PERIOD_RANGES.get(period) if period else None
+    if resolve is None:
+        return None, None
+    return resolve(date.today())
 
 
 class PurchaseService:
@@ -236,7 +221,7 @@ class PurchaseService:
 
             # Calculate total from items if not provided
             calculated_total = Decimal("0")
-            receipt_items: list[ReceiptItem] = []
+            receipt_items: list[dict[str, Any]] = []
 
             for item_data in items:
                 qty = Decimal(str(item_data.get("quantity", 1)))
@@ -254,14 +239,14 @@ class PurchaseService:
                 )
 
                 receipt_items.append(
-                    ReceiptItem(
-                        id=uuid.uuid4(),
-                        product_id=product.id,
-                        name_on_receipt=item_data["name"],
-                        quantity=qty,
-                        unit_price=unit_price,
-                        total_price=item_total,
-                    )
+                    {
+                        "id": uuid7(),
+                        "product_id": product.id,
+                        "name_on_receipt": item_data["name"],
+                        "quantity": qty,
+                        "unit_price": unit_price,
+                        "total_price": item_total,
+                    }
                 )
 
             final_total = (
@@ -270,7 +255,7 @@ class PurchaseService:
 
             # Create receipt
             receipt = Receipt(
-                id=uuid.uuid4(),
+                id=uuid7(),
                 user_id=user_id,
                 store_id=store.id,
                 purchase_date=p_date,
@@ -279,10 +264,10 @@ class PurchaseService:
             session.add(receipt)
             await session.flush()
 
-            # Attach items to receipt
-            for item in receipt_items:
-                item.receipt_id = receipt.id
-                session.add(item)
+            # Attach items to receipt and write them in one COPY
+            await copy_receipt_items(
+                session, [{**item, "receipt_id": receipt.id} for item in receipt_items]
+            )
 
             await session.commit()
 
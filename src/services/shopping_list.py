@@ -25,7 +25,7 @@ class ShoppingListService:
         self,
         user_id: uuid.UUID,
         name: str,
-        items: list[dict[str, Any]],
+        items: list[dict[str, Any]] | None = None,
     ) -> dict[str, Any]:
         """Create a new shopping list with optional initial items."""
         async with async_session() as session:
@@ -38,7 +38,7 @@ class ShoppingListService:
             await session.flush()
 
             created_items = []
-            for item_data in items:
+            for item_data in items or []:
                 item_name = item_data["name"]
                 product, _ = await self.product_matcher.find_or_create_product(
                     item_name, session
@@ -8,11 +8,14 @@ generated by the LLM. Safety measures:
 - SQL validation (must start with SELECT)
 """
 
+import asyncio
 import logging
+import re
 import uuid
+from collections.abc import Sequence
 from typing import Any
 
-from sqlalchemy import text
+from sqlalchemy import Row, text
 
 from src.db.session import readonly_session
 
@@ -35,6 +38,17 @@ FORBIDDEN_KEYWORDS = [
 ]
 
 
+# Query checks, compiled once at import
+_READ_QUERY_RE = re.compile(r"(?:SELECT|WITH)\b", re.IGNORECASE)
+_FORBIDDEN_RE = re.compile(
+    "|".join(
+        rf"\b{keyword}\b" if keyword.isalpha() else re.escape(keyword)
+        for keyword in FORBIDDEN_KEYWORDS
+    ),
+    re.IGNORECASE,
+)
+
+
 def _validate_sql(sql: str) -> tuple[bool, str]:
     """Validate that a SQL query is safe to execute.
 
@@ -47,15 +61,14 @@ def _validate_sql(sql: str) -> tuple[bool, str]:
         return False, "Empty query."
 
     # Must start with SELECT or WITH (for CTEs)
-    upper = cleaned.upper()
-    if not (upper.startswith("SELECT") or upper.startswith("WITH")):
+    if not _READ_QUERY_RE.match(cleaned):
         return False, "Only SELECT queries are allowed."
 
-    # Check for forbidden keywords (basic protection layer on top of DB role)
-    for keyword in FORBIDDEN_KEYWORDS:
-        # Check as whole word to avoid false positives (e.g., "SELECTED")
-        if f" {keyword} " in f" {upper} " or upper.startswith(f"{keyword} "):
-            return False, f"Query contains forbidden keyword: {keyword}"
+    # Check for forbidden keywords as whole words (basic protection layer on
+    # top of the DB role), so e.g. "created_at" does not match CREATE
+    forbidden = _FORBIDDEN_RE.search(cleaned)
+    if forbidden:
+        return False, f"Query contains forbidden keyword: {forbidden.group().upper()}"
 
     return True, ""
 
@@ -115,30 +128,25 @@ class TextToSQLService:
                 rows = result.fetchall()
                 columns = list(result.keys())
 
-                # Format results
-                formatted_rows = [
-                    {
-                        col: self._serialize_value(row[i])
-                        for i, col in enumerate(columns)
-                    }
-                    for row in rows
-                ]
-
-                logger.info(
-                    "Text-to-SQL returned %d rows for user %s",
-                    len(formatted_rows),
-                    user_id,
-                )
+            # Format results after the connection is back in the pool, in a
+            # worker thread so large result sets do not stall the event loop
+            formatted_rows = await asyncio.to_thread(self._format_rows, columns, rows)
+
+            logger.info(
+                "Text-to-SQL returned %d rows for user %s",
+                len(formatted_rows),
+                user_id,
+            )
 
-                return {
-                    "status": "success",
-                    "question": question,
-                    "sql_executed": cleaned_sql,
-                    "columns": columns,
-                    "rows": formatted_rows,
-                    "row_count": len(formatted_rows),
-                    "truncated": len(rows) >= MAX_ROWS,
-                }
+            return {
+                "status": "success",
+                "question": question,
+                "sql_executed": cleaned_sql,
+                "columns": columns,
+                "rows": formatted_rows,
+                "row_count": len(formatted_rows),
+                "truncated": len(rows) >= MAX_ROWS,
+            }
 
         except Exception as e:
             error_msg = str(e)
@@ -158,6 +166,15 @@ class TextToSQLService:
                 "error": user_error,
             }
 
+    def _format_rows(
+        self, columns: list[str], rows: Sequence[Row[Any]]
+    ) -> list[dict[str, Any]]:
+        """Convert result rows to JSON-safe dicts keyed by column name."""
+        return [
+            {col: self._serialize_value(row[i]) for i, col in enumerate(columns)}
+            for row in rows
+        ]
+
     def _serialize_value(self, value: Any) -> Any:
         """Serialize a database value to JSON-safe format."""
         if value is None:
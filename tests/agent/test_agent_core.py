@@ -1,10 +1,11 @@
 """Agent core loop tests with mocked LLM."""
 
+import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
-from src.agent.core import AgentCore
+from src.agent.core import MAX_HISTORY_TURNS, MAX_TOOL_ROUNDS, AgentCore
 from tests.conftest import llm_text_response, llm_tool_call_response
 
 pytestmark = [pytest.mark.agent, pytest.mark.asyncio]
@@ -88,11 +89,101 @@ class TestAgentCore:
 
         assert agent.tool_executor.execute.call_count == 2
 
+    async def test_parallel_tool_calls_keep_request_order(self, sample_user):
+        """Several tool calls in one round run concurrently; results stay in order."""
+        round1 = llm_tool_call_response("search_purchases", {}, "call_1")
+        second_call = MagicMock()
+        second_call.id = "call_2"
+        second_call.function.name = "get_spending_summary"
+        second_call.function.arguments = "{}"
+        round1.choices[0].message.tool_calls.append(second_call)
+        final = llm_text_response("Done.")
+        responses = iter([round1, final])
+        captured_messages = []
+
+        async def capture_completion(**kwargs):
+            captured_messages[:] = kwargs["messages"]
+            return next(responses)
+
+        async def slow_first(tool_name, arguments, user):
+            if tool_name == "search_purchases":
+                await asyncio.sleep(0.01)
+            return tool_name
+
+        with (
+            patch("src.agent.core.litellm") as mock_litellm,
+            patch("src.agent.core.settings") as mock_settings,
+        ):
+            mock_settings.gemini_api_key = "test"
+            mock_settings.openai_api_key = "test"
+            mock_settings.conversational_model = "test-model"
+            mock_litellm.acompletion = AsyncMock(side_effect=capture_completion)
+
+            agent = AgentCore()
+            agent.tool_executor = MagicMock()
+            agent.tool_executor.execute = AsyncMock(side_effect=slow_first)
+
+            result = await agent.process_message(sample_user, "Two things")
+
+        assert result == "Done."
+        assistant_msg = next(m for m in captured_messages if m["role"] == "assistant")
+        assert [tc["id"] for tc in assistant_msg["tool_calls"]] == ["call_1", "call_2"]
+        tool_messages = [m for m in captured_messages if m["role"] == "tool"]
+        assert [m["tool_call_id"] for m in tool_messages] == ["call_1", "call_2"]
+        assert [m["content"] for m in tool_messages] == [
+            "search_purchases",
+            "get_spending_summary",
+        ]
+
+    async def test_write_tool_calls_run_in_request_order(self, sample_user):
+        """Write tools in one round run one at a time; reads run alongside them."""
+        round1 = llm_tool_call_response(
+            "add_manual_purchase", {"store": "A", "items": []}, "call_1"
+        )
+        for call_id, name in [
+            ("call_2", "search_purchases"),
+            ("call_3", "add_manual_purchase"),
+        ]:
+            extra_call = MagicMock()
+            extra_call.id = call_id
+            extra_call.function.name = name
+            extra_call.function.arguments = "{}"
+            round1.choices[0].message.tool_calls.append(extra_call)
+        final = llm_text_response("Saved.")
+        events = []
+
+        async def record(tool_name, arguments, user):
+            events.append(("start", tool_name, arguments.get("store")))
+            await asyncio.sleep(0.01)
+            events.append(("end", tool_name, arguments.get("store")))
+            return {}
+
+        with (
+            patch("src.agent.core.litellm") as mock_litellm,
+            patch("src.agent.core.settings") as mock_settings,
+        ):
+            mock_settings.gemini_api_key = "test"
+            mock_settings.openai_api_key = "test"
+            mock_settings.conversational_model = "test-model"
+            mock_litellm.acompletion = AsyncMock(side_effect=[round1, final])
+
+            agent = AgentCore()
+            agent.tool_executor = MagicMock()
+            agent.tool_executor.execute = AsyncMock(side_effect=record)
+
+            await agent.process_message(sample_user, "Save two purchases")
+
+        first_write_end = events.index(("end", "add_manual_purchase", "A"))
+        second_write_start = events.index(("start", "add_manual_purchase", None))
+        read_start = events.index(("start", "search_purchases", None))
+        assert first_write_end < second_write_start
+        assert read_start < first_write_end
+
     async def test_max_rounds_produces_final_response(self, sample_user):
         """After MAX_TOOL_ROUNDS, the agent forces a final answer."""
         # 5 rounds of tool calls, then a forced final
         tool_responses = [
-            llm_tool_call_response("search_purchases", {}, f"call_{i}")
+            llm_tool_call_response("search_purchases", {"page": i}, f"call_{i}")
             for i in range(5)
         ]
         final = llm_text_response("Here's what I found.")
@@ -114,6 +205,91 @@ class TestAgentCore:
 
         assert result == "Here's what I found."
 
+    async def test_max_rounds_ignores_text_sent_with_tool_calls(self, sample_user):
+        """Text alongside the last tool calls predates their results -> still ask."""
+        tool_responses = [
+            llm_tool_call_response("search_purchases", {"page": i}, f"call_{i}")
+            for i in range(MAX_TOOL_ROUNDS)
+        ]
+        tool_responses[-1].choices[0].message.content = "Let me look that up..."
+        final = llm_text_response("Here's what I found.")
+
+        with (
+            patch("src.agent.core.litellm") as mock_litellm,
+            patch("src.agent.core.settings") as mock_settings,
+        ):
+            mock_settings.gemini_api_key = "test"
+            mock_settings.openai_api_key = "test"
+            mock_settings.conversational_model = "test-model"
+            mock_litellm.acompletion = AsyncMock(side_effect=[*tool_responses, final])
+
+            agent = AgentCore()
+            agent.tool_executor = MagicMock()
+            agent.tool_executor.execute = AsyncMock(return_value={})
+
+            result = await agent.process_message(sample_user, "Keep calling tools")
+
+        assert result == "Here's what I found."
+        assert mock_litellm.acompletion.await_count == MAX_TOOL_ROUNDS + 1
+
+    async def test_repeated_tool_call_stops_early(self, sample_user):
+        """Same call with the same result twice -> stop looping, ask for final answer."""
+        tool_responses = [
+            llm_tool_call_response("search_purchases", {"query": "milk"}, f"call_{i}")
+            for i in range(2)
+        ]
+        final = llm_text_response("No milk purchases found.")
+
+        with (
+            patch("src.agent.core.litellm") as mock_litellm,
+            patch("src.agent.core.settings") as mock_settings,
+        ):
+            mock_settings.gemini_api_key = "test"
+            mock_settings.openai_api_key = "test"
+            mock_settings.conversational_model = "test-model"
+            mock_litellm.acompletion = AsyncMock(side_effect=[*tool_responses, final])
+
+            agent = AgentCore()
+            agent.tool_executor = MagicMock()
+            agent.tool_executor.execute = AsyncMock(return_value={"results": []})
+
+            result = await agent.process_message(sample_user, "Any milk?")
+
+        assert result == "No milk purchases found."
+        assert agent.tool_executor.execute.call_count == 2
+        # Final call is made without tools
+        assert "tools" not in mock_litellm.acompletion.await_args.kwargs
+
+    async def test_duplicate_call_within_one_round_does_not_stop(self, sample_user):
+        """The same call twice in one parallel batch is not a repeat across rounds."""
+        round1 = llm_tool_call_response("search_purchases", {"query": "milk"}, "a")
+        round1.choices[0].message.tool_calls.append(
+            llm_tool_call_response("search_purchases", {"query": "milk"}, "b")
+            .choices[0]
+            .message.tool_calls[0]
+        )
+        round2 = llm_tool_call_response("search_purchases", {"query": "eggs"}, "c")
+        final = llm_text_response("Milk yes, eggs no.")
+
+        with (
+            patch("src.agent.core.litellm") as mock_litellm,
+            patch("src.agent.core.settings") as mock_settings,
+        ):
+            mock_settings.gemini_api_key = "test"
+            mock_settings.openai_api_key = "test"
+            mock_settings.conversational_model = "test-model"
+            mock_litellm.acompletion = AsyncMock(side_effect=[round1, round2, final])
+
+            agent = AgentCore()
+            agent.tool_executor = MagicMock()
+            agent.tool_executor.execute = AsyncMock(return_value={"results": []})
+
+            result = await agent.process_message(sample_user, "Milk and eggs?")
+
+        assert result == "Milk yes, eggs no."
+        assert agent.tool_executor.execute.call_count == 3
+        assert "tools" in mock_litellm.acompletion.await_args_list[1].kwargs
+
     async def test_llm_api_failure_returns_error_message(self, sample_user):
         """LLM raises exception -> user gets friendly error."""
         with (
@@ -256,6 +432,46 @@ class TestAgentCore:
         assert captured_messages[2]["content"] == "You spent 50 EUR."
         assert captured_messages[3]["content"] == "Break down by store"
 
+    async def test_conversation_history_is_windowed(self, sample_user):
+        """Only the last MAX_HISTORY_TURNS messages of history are sent."""
+        mock_resp = llm_text_response("OK")
+        captured_messages = []
+
+        async def capture_completion(**kwargs):
+            captured_messages.extend(kwargs.get("messages", []))
+            return mock_resp
+
+        history = [
+            {"role": "user", "content": f"message {i}"}
+            for i in range(MAX_HISTORY_TURNS + 5)
+        ]
+        # A tool result at the window edge would be orphaned -> dropped.
+        history[-MAX_HISTORY_TURNS] = {
+            "role": "tool",
+            "tool_call_id": "call_old",
+            "content": "{}",
+        }
+
+        with (
+            patch("src.agent.core.litellm") as mock_litellm,
+            patch("src.agent.core.settings") as mock_settings,
+        ):
+            mock_settings.gemini_api_key = "test"
+            mock_settings.openai_api_key = "test"
+            mock_settings.conversational_model = "test-model"
+            mock_litellm.acompletion = AsyncMock(side_effect=capture_completion)
+
+            agent = AgentCore()
+            await agent.process_message(
+                sample_user, "Latest", conversation_history=history
+            )
+
+        # system + (window minus orphaned tool result) + current message
+        assert len(captured_messages) == MAX_HISTORY_TURNS + 1
+        assert captured_messages[1]["role"] == "user"
+        assert captured_messages[-2]["content"] == history[-1]["content"]
+        assert captured_messages[-1]["content"] == "Latest"
+
     async def test_tool_definitions_passed_to_llm(self, sample_user):
         """tools=TOOL_DEFINITIONS is passed in the litellm call."""
         mock_resp = llm_text_response("Hello!")
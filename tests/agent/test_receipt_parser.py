@@ -1,12 +1,27 @@
 """Tests for the receipt parsing pipeline with mocked vision model."""
 
+import io
 import json
 from datetime import date
+from decimal import Decimal
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
-
-from src.agent.receipt_parser import ExtractedReceipt, ReceiptParser
+from litellm.exceptions import RateLimitError
+from PIL import Image
+
+from src.agent.receipt_parser import (
+    RECEIPT_EXTRACTION_PROMPT,
+    VISION_MAX_ATTEMPTS,
+    VISION_MAX_EDGE_PX,
+    ExtractedReceipt,
+    MatchedItem,
+    ReceiptParser,
+    _downscale_image,
+    _parse_purchase_date,
+    _RateLimiter,
+)
+from src.cache import TTLCache
 
 pytestmark = pytest.mark.agent
 
@@ -60,12 +75,11 @@ class TestExtractFromImage:
         assert isinstance(result, ExtractedReceipt)
         assert result.store_name == "Mercadona"
         assert len(result.items) == 3
-        assert result.total == 9.49
+        assert result.total == Decimal("9.49")
 
-    async def test_with_markdown_fences(self):
+    async def test_requests_json_object_response(self):
         parser = ReceiptParser()
-        wrapped = f"```json\n{json.dumps(SAMPLE_RECEIPT_JSON)}\n```"
-        resp = _mock_vision_response(wrapped)
+        resp = _mock_vision_response(json.dumps(SAMPLE_RECEIPT_JSON))
 
         with (
             patch("src.agent.receipt_parser.litellm") as mock_litellm,
@@ -74,9 +88,27 @@ class TestExtractFromImage:
             mock_settings.vision_model = "gpt-4o"
             mock_litellm.acompletion = AsyncMock(return_value=resp)
 
-            result = await parser.extract_from_image(b"fake-image-data")
+            await parser.extract_from_image(b"fake-image-data")
 
-        assert result.store_name == "Mercadona"
+        call_kwargs = mock_litellm.acompletion.call_args.kwargs
+        assert call_kwargs["response_format"] == {"type": "json_object"}
+
+    async def test_prompt_sent_as_system_message(self):
+        parser = ReceiptParser()
+        resp = _mock_vision_response(json.dumps(SAMPLE_RECEIPT_JSON))
+
+        with (
+            patch("src.agent.receipt_parser.litellm") as mock_litellm,
+            patch("src.agent.receipt_parser.settings") as mock_settings,
+        ):
+            mock_settings.vision_model = "gpt-4o"
+            mock_litellm.acompletion = AsyncMock(return_value=resp)
+
+            await parser.extract_from_image(b"fake-image-data")
+
+        system, user = mock_litellm.acompletion.call_args.kwargs["messages"]
+        assert system == {"role": "system", "content": RECEIPT_EXTRACTION_PROMPT}
+        assert [part["type"] for part in user["content"]] == ["image_url"]
 
     async def test_invalid_json(self):
         parser = ReceiptParser()
@@ -108,6 +140,114 @@ class TestExtractFromImage:
                 await parser.extract_from_image(b"fake-image-data")
 
 
+@pytest.mark.asyncio
+class TestVisionCallLimits:
+    async def test_retries_transient_error(self):
+        parser = ReceiptParser()
+        resp = _mock_vision_response(json.dumps(SAMPLE_RECEIPT_JSON))
+        rate_limited = RateLimitError("slow down", llm_provider="openai", model="x")
+
+        with (
+            patch("src.agent.receipt_parser.litellm") as mock_litellm,
+            patch("src.agent.receipt_parser.settings") as mock_settings,
+            patch("src.agent.receipt_parser.asyncio.sleep", new=AsyncMock()) as sleep,
+        ):
+            mock_settings.vision_model = "gpt-4o"
+            mock_litellm.acompletion = AsyncMock(side_effect=[rate_limited, resp])
+
+            result = await parser.extract_from_image(b"fake-image-data")
+
+        assert result.store_name == "Mercadona"
+        assert mock_litellm.acompletion.await_count == 2
+        sleep.assert_awaited_once()
+
+    async def test_gives_up_after_max_attempts(self):
+        parser = ReceiptParser()
+        rate_limited = RateLimitError("slow down", llm_provider="openai", model="x")
+
+        with (
+            patch("src.agent.receipt_parser.litellm") as mock_litellm,
+            patch("src.agent.receipt_parser.settings") as mock_settings,
+            patch("src.agent.receipt_parser.asyncio.sleep", new=AsyncMock()),
+        ):
+            mock_settings.vision_model = "gpt-4o"
+            mock_litellm.acompletion = AsyncMock(side_effect=rate_limited)
+
+            with pytest.raises(RateLimitError):
+                await parser.extract_from_image(b"fake-image-data")
+
+        assert mock_litellm.acompletion.await_count == VISION_MAX_ATTEMPTS
+
+    async def test_rate_limiter_spaces_calls(self):
+        limiter = _RateLimiter(rps=10)
+
+        with patch("src.agent.receipt_parser.asyncio.sleep", new=AsyncMock()) as sleep:
+            for _ in range(3):
+                await limiter.acquire()
+
+        delays = [c.args[0] for c in sleep.await_args_list]
+        assert len(delays) == 2
+        assert delays[0] == pytest.approx(0.1, abs=0.05)
+        assert delays[1] == pytest.approx(0.2, abs=0.05)
+
+    async def test_does_not_retry_other_errors(self):
+        parser = ReceiptParser()
+
+        with (
+            patch("src.agent.receipt_parser.litellm") as mock_litellm,
+            patch("src.agent.receipt_parser.settings") as mock_settings,
+        ):
+            mock_settings.vision_model = "gpt-4o"
+            mock_litellm.acompletion = AsyncMock(side_effect=RuntimeError("boom"))
+
+            with pytest.raises(RuntimeError):
+                await parser.extract_from_image(b"fake-image-data")
+
+        assert mock_litellm.acompletion.await_count == 1
+
+
+@pytest.mark.asyncio
+class TestExtractionCache:
+    async def test_identical_image_skips_vision_call(self):
+        parser = ReceiptParser()
+        resp = _mock_vision_response(json.dumps(SAMPLE_RECEIPT_JSON))
+
+        with (
+            patch("src.agent.receipt_parser.litellm") as mock_litellm,
+            patch("src.agent.receipt_parser.settings") as mock_settings,
+            patch(
+                "src.agent.receipt_parser._VISION_CACHE",
+                TTLCache(maxsize=8, ttl=60),
+            ),
+        ):
+            mock_settings.vision_model = "gpt-4o"
+            mock_litellm.acompletion = AsyncMock(return_value=resp)
+
+            first = await parser.extract_from_image(b"same-image")
+            second = await parser.extract_from_image(b"same-image")
+            await parser.extract_from_image(b"other-image")
+
+        assert second == first
+        assert mock_litellm.acompletion.await_count == 2
+
+    async def test_no_hashing_when_cache_disabled(self):
+        parser = ReceiptParser()
+        resp = _mock_vision_response(json.dumps(SAMPLE_RECEIPT_JSON))
+
+        with (
+            patch("src.agent.receipt_parser.litellm") as mock_litellm,
+            patch("src.agent.receipt_parser.settings") as mock_settings,
+            patch("src.agent.receipt_parser._VISION_CACHE", None),
+            patch("src.agent.receipt_parser.hashlib") as mock_hashlib,
+        ):
+            mock_settings.vision_model = "gpt-4o"
+            mock_litellm.acompletion = AsyncMock(return_value=resp)
+
+            await parser.extract_from_image(b"same-image")
+
+        mock_hashlib.blake2b.assert_not_called()
+
+
 @pytest.mark.asyncio
 class TestParseAndStore:
     async def test_saves_receipt(self, patch_db_session, db_session, db_user):
@@ -127,6 +267,10 @@ class TestParseAndStore:
         assert "9.49" in summary
 
     async def test_saves_all_items(self, patch_db_session, db_session, db_user):
+        from sqlalchemy import select
+
+        from src.db.models import ReceiptItem
+
         parser = ReceiptParser()
         resp = _mock_vision_response(json.dumps(SAMPLE_RECEIPT_JSON))
 
@@ -143,6 +287,14 @@ class TestParseAndStore:
         assert "Bread" in summary
         assert "Milk" in summary
 
+        rows = (
+            await db_session.execute(
+                select(ReceiptItem.name_on_receipt, ReceiptItem.product_id)
+            )
+        ).all()
+        assert sorted(name for name, _ in rows) == ["Bread", "Chicken Breast", "Milk"]
+        assert all(product_id is not None for _, product_id in rows)
+
     async def test_creates_store(self, patch_db_session, db_session, db_user):
         from sqlalchemy import select
 
@@ -167,27 +319,26 @@ class TestParseAndStore:
 
 class TestBuildSummary:
     def test_format(self):
-        parser = ReceiptParser()
-        summary = parser._build_summary(
+        summary = ReceiptParser._build_summary(
             store_name="Mercadona",
             purchase_date=date(2026, 2, 11),
             items=[
-                {
-                    "name": "Chicken",
-                    "canonical": "Chicken Breast",
-                    "is_new": False,
-                    "qty": 1,
-                    "price": 5.99,
-                },
-                {
-                    "name": "Bread",
-                    "canonical": "Bread",
-                    "is_new": True,
-                    "qty": 2,
-                    "price": 2.40,
-                },
+                MatchedItem(
+                    name="Chicken",
+                    canonical="Chicken Breast",
+                    is_new=False,
+                    qty=Decimal(1),
+                    price=Decimal("5.99"),
+                ),
+                MatchedItem(
+                    name="Bread",
+                    canonical="Bread",
+                    is_new=True,
+                    qty=Decimal(2),
+                    price=Decimal("2.40"),
+                ),
             ],
-            total=8.39,
+            total=Decimal("8.39"),
             currency="EUR",
             confidence_notes=[],
             receipt_id="abc12345-6789",
@@ -195,15 +346,15 @@ class TestBuildSummary:
         assert "Mercadona" in summary
         assert "2026-02-11" in summary
         assert "8.39" in summary
-        assert "new product" in summary  # Bread is new
+        assert "- 2x Bread -- 2.40 EUR (new product)" in summary
+        assert "- Chicken -- 5.99 EUR\n" in summary
 
     def test_with_confidence_notes(self):
-        parser = ReceiptParser()
-        summary = parser._build_summary(
+        summary = ReceiptParser._build_summary(
             store_name="X",
             purchase_date=date.today(),
             items=[],
-            total=0,
+            total=Decimal(0),
             currency="EUR",
             confidence_notes=["Could not read item 3"],
             receipt_id="abc",
@@ -211,6 +362,32 @@ class TestBuildSummary:
         assert "Could not read item 3" in summary
 
 
+class TestParsePurchaseDate:
+    def test_valid_date(self):
+        assert _parse_purchase_date("2026-02-11") == date(2026, 2, 11)
+
+    def test_missing_date(self):
+        assert _parse_purchase_date(None) is None
+
+    def test_malformed_date(self):
+        assert _parse_purchase_date("11/02/2026") is None
+
+
+class TestDownscaleImage:
+    def test_large_image_is_shrunk_to_max_edge(self):
+        buf = io.BytesIO()
+        Image.new("RGB", (4000, 3000), "white").save(buf, "PNG")
+
+        result = _downscale_image(buf.getvalue())
+
+        with Image.open(io.BytesIO(result)) as img:
+            assert img.format == "JPEG"
+            assert max(img.size) == VISION_MAX_EDGE_PX
+
+    def test_undecodable_bytes_are_returned_unchanged(self):
+        assert _downscale_image(b"not-an-image") == b"not-an-image"
+
+
 @pytest.mark.asyncio
 class TestImageEncoding:
     async def test_image_sent_as_base64(self):
@@ -237,6 +414,6 @@ class TestImageEncoding:
             await parser.extract_from_image(image_data)
 
         messages = captured_kwargs.get("messages", [])
-        content = messages[0]["content"]
+        content = messages[-1]["content"]
         image_part = next(p for p in content if p.get("type") == "image_url")
         assert expected_b64 in image_part["image_url"]["url"]
@@ -1,11 +1,14 @@
 """Tests for the ToolExecutor dispatch logic."""
 
-from unittest.mock import AsyncMock, MagicMock, patch
+import asyncio
+import uuid
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
 from src.agent.tool_executor import ToolExecutor
 from src.agent.tools import TOOL_DEFINITIONS
+from src.cache import TTLCache
 
 pytestmark = [pytest.mark.agent, pytest.mark.asyncio]
 
@@ -19,6 +22,7 @@ class TestToolExecutor:
         ex.analytics_service = AsyncMock()
         ex.shopping_list_service = AsyncMock()
         ex.discount_service = AsyncMock()
+        ex.text_to_sql_service = AsyncMock()
         return ex
 
     async def test_dispatch_search_purchases(self, executor, sample_user):
@@ -66,46 +70,115 @@ class TestToolExecutor:
         executor.discount_service.register_discount.assert_called_once()
 
     async def test_dispatch_run_analytics_query(self, executor, sample_user):
-        with patch("src.services.text_to_sql.TextToSQLService") as mock_tts:
-            mock_svc = MagicMock()
-            mock_svc.execute_query = AsyncMock(return_value={"status": "success"})
-            mock_tts.return_value = mock_svc
-
-            await executor.execute(
-                "run_analytics_query",
-                {
-                    "question": "how many stores?",
-                    "sql_query": "SELECT COUNT(*) FROM stores",
-                },
-                sample_user,
-            )
-            mock_svc.execute_query.assert_called_once()
+        executor.text_to_sql_service.execute_query = AsyncMock(
+            return_value={"status": "success"}
+        )
+        await executor.execute(
+            "run_analytics_query",
+            {
+                "question": "how many stores?",
+                "sql_query": "SELECT COUNT(*) FROM stores",
+            },
+            sample_user,
+        )
+        executor.text_to_sql_service.execute_query.assert_called_once()
 
     async def test_dispatch_all_13_tools(self, executor, sample_user):
-        """Every tool name in TOOL_DEFINITIONS resolves without ValueError."""
-        tool_names = [t["function"]["name"] for t in TOOL_DEFINITIONS]
-        for name in tool_names:
-            if name == "run_analytics_query":
-                with patch("src.services.text_to_sql.TextToSQLService") as mock_tts:
-                    mock_svc = MagicMock()
-                    mock_svc.execute_query = AsyncMock(return_value={})
-                    mock_tts.return_value = mock_svc
-                    await executor.execute(
-                        name, {"question": "q", "sql_query": "SELECT 1"}, sample_user
-                    )
-            else:
-                # Provide minimal required args; services are AsyncMock so any method is awaitable
-                import contextlib
-
-                with contextlib.suppress(TypeError):
-                    await executor.execute(name, {}, sample_user)
+        """Every tool in TOOL_DEFINITIONS dispatches with its required arguments."""
+        for tool in TOOL_DEFINITIONS:
+            params = tool["function"]["parameters"]
+            arguments = {name: "x" for name in params.get("required", [])}
+            await executor.execute(tool["function"]["name"], arguments, sample_user)
 
     async def test_unknown_tool_raises_valueerror(self, executor, sample_user):
         with pytest.raises(ValueError, match="Unknown tool"):
             await executor.execute("nonexistent_tool", {}, sample_user)
 
-    async def test_optional_args_default_correctly(self, executor, sample_user):
+    async def test_missing_required_argument_raises_valueerror(
+        self, executor, sample_user
+    ):
+        with pytest.raises(ValueError, match="missing required arguments: product"):
+            await executor.execute("compare_prices", {"product": None}, sample_user)
+        executor.analytics_service.compare_prices.assert_not_called()
+
+    async def test_unexpected_argument_raises_valueerror(self, executor, sample_user):
+        with pytest.raises(ValueError, match="unexpected arguments: shop"):
+            await executor.execute("search_purchases", {"shop": "Lidl"}, sample_user)
+        executor.purchase_service.search_purchases.assert_not_called()
+
+    async def test_optional_args_left_to_service_defaults(self, executor, sample_user):
         executor.purchase_service.search_purchases = AsyncMock(return_value={})
-        await executor.execute("search_purchases", {}, sample_user)
+        await executor.execute(
+            "search_purchases", {"query": "milk", "limit": None}, sample_user
+        )
         call_kwargs = executor.purchase_service.search_purchases.call_args.kwargs
-        assert call_kwargs.get("limit") == 20
+        assert call_kwargs == {"user_id": sample_user.id, "query": "milk"}
+
+    async def test_renamed_args_reach_service(self, executor, sample_user):
+        executor.purchase_service.add_manual_purchase = AsyncMock(return_value={})
+        await executor.execute(
+            "add_manual_purchase",
+            {"store": "Lidl", "items": [], "date": "2026-02-11", "total": 3.5},
+            sample_user,
+        )
+        executor.purchase_service.add_manual_purchase.assert_called_once_with(
+            user_id=sample_user.id,
+            store_name="Lidl",
+            items=[],
+            purchase_date="2026-02-11",
+            total_amount=3.5,
+        )
+
+    async def test_unscoped_tool_gets_no_user_id(self, executor, sample_user):
+        executor.discount_service.get_active_discounts = AsyncMock(return_value={})
+        await executor.execute("get_active_discounts", {"store": "Lidl"}, sample_user)
+        executor.discount_service.get_active_discounts.assert_called_once_with(
+            store="Lidl"
+        )
+
+
+class TestToolResultCache:
+    @pytest.fixture
+    def executor(self):
+        ex = ToolExecutor()
+        ex.purchase_service = AsyncMock()
+        ex.purchase_service.search_purchases = AsyncMock(return_value={"results": []})
+        ex._result_cache = TTLCache(maxsize=8, ttl=60)
+        return ex
+
+    async def test_repeated_read_is_served_from_cache(self, executor, sample_user):
+        await executor.execute("search_purchases", {"query": "milk"}, sample_user)
+        await executor.execute("search_purchases", {"query": "milk"}, sample_user)
+        await executor.execute("search_purchases", {"query": "eggs"}, sample_user)
+
+        assert executor.purchase_service.search_purchases.await_count == 2
+
+    async def test_write_invalidates_cached_reads(self, executor, sample_user):
+        await executor.execute("search_purchases", {"query": "milk"}, sample_user)
+        await executor.execute(
+            "add_manual_purchase", {"store": "Lidl", "items": []}, sample_user
+        )
+        await executor.execute("search_purchases", {"query": "milk"}, sample_user)
+
+        assert executor.purchase_service.search_purchases.await_count == 2
+
+    async def test_concurrent_identical_reads_share_one_call(
+        self, executor, sample_user
+    ):
+        async def slow_discounts(**kwargs):
+            await asyncio.sleep(0.01)
+            return {"discounts": []}
+
+        executor.discount_service = AsyncMock()
+        executor.discount_service.get_active_discounts = AsyncMock(
+            side_effect=slow_discounts
+        )
+        other_user = MagicMock(id=uuid.uuid4())
+
+        results = await asyncio.gather(
+            executor.execute("get_active_discounts", {"store": "Lidl"}, sample_user),
+            executor.execute("get_active_discounts", {"store": "Lidl"}, other_user),
+        )
+
+        assert results == [{"discounts": []}, {"discounts": []}]
+        assert executor.discount_service.get_active_discounts.await_count == 1
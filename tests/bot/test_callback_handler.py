@@ -2,7 +2,13 @@
 
 import pytest
 
-from src.bot.handlers.callback import list_item_check, receipt_confirm, receipt_edit
+from src.bot.handlers.callback import (
+    _CALLBACK_RE,
+    handle_callback,
+    list_item_check,
+    receipt_confirm,
+    receipt_edit,
+)
 from tests.conftest import make_mock_callback
 
 pytestmark = [pytest.mark.bot, pytest.mark.asyncio]
@@ -14,6 +20,7 @@ class TestCallbackHandler:
         await receipt_confirm(cb, sample_user)
         cb.answer.assert_called_once()
         assert "confirmed" in cb.answer.call_args.args[0].lower()
+        cb.message.edit_text.assert_called_once()
 
     async def test_receipt_edit(self, sample_user):
         cb = make_mock_callback(data="receipt_edit:abc12345-6789")
@@ -32,3 +39,12 @@ class TestCallbackHandler:
         cb = make_mock_callback(data=None)
         # Should not crash
         await receipt_confirm(cb, sample_user)
+
+    async def test_dispatch_by_prefix(self, sample_user):
+        cb = make_mock_callback(data="receipt_edit:abc12345-6789")
+        match = _CALLBACK_RE.match(cb.data)
+        await handle_callback(cb, sample_user, match)
+        cb.message.answer.assert_called_once()
+
+    async def test_unknown_prefix_not_matched(self):
+        assert _CALLBACK_RE.match("other_action:123") is None
@@ -16,7 +16,7 @@ class TestMessageHandler:
         mock_agent = MagicMock()
         mock_agent.process_message = AsyncMock(return_value="You spent 50 EUR.")
 
-        with patch("src.bot.handlers.message.AgentCore", return_value=mock_agent):
+        with patch("src.bot.handlers.message.agent_core", mock_agent):
             await handle_text_message(msg, sample_user)
 
         mock_agent.process_message.assert_called_once()
@@ -26,7 +26,7 @@ class TestMessageHandler:
         mock_agent = MagicMock()
         mock_agent.process_message = AsyncMock(return_value="Hi!")
 
-        with patch("src.bot.handlers.message.AgentCore", return_value=mock_agent):
+        with patch("src.bot.handlers.message.agent_core", mock_agent):
             await handle_text_message(msg, sample_user)
 
         msg.chat.do.assert_called_with("typing")
@@ -36,7 +36,7 @@ class TestMessageHandler:
         mock_agent = MagicMock()
         mock_agent.process_message = AsyncMock(return_value="Agent says hello!")
 
-        with patch("src.bot.handlers.message.AgentCore", return_value=mock_agent):
+        with patch("src.bot.handlers.message.agent_core", mock_agent):
             await handle_text_message(msg, sample_user)
 
         msg.answer.assert_called_once()
@@ -47,7 +47,7 @@ class TestMessageHandler:
         mock_agent = MagicMock()
         mock_agent.process_message = AsyncMock(side_effect=Exception("Boom"))
 
-        with patch("src.bot.handlers.message.AgentCore", return_value=mock_agent):
+        with patch("src.bot.handlers.message.agent_core", mock_agent):
             await handle_text_message(msg, sample_user)
 
         msg.answer.assert_called_once()
@@ -57,7 +57,7 @@ class TestMessageHandler:
     async def test_empty_text_is_skipped(self, sample_user):
         msg = make_mock_message(text=None)
 
-        with patch("src.bot.handlers.message.AgentCore") as mock_agent:
+        with patch("src.bot.handlers.message.agent_core") as mock_agent:
             await handle_text_message(msg, sample_user)
 
-        mock_agent.assert_not_called()
+        mock_agent.process_message.assert_not_called()
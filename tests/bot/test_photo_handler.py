@@ -22,7 +22,7 @@ def _make_photo_message():
     file.file_path = "photos/receipt.jpg"
     msg.bot.get_file = AsyncMock(return_value=file)
 
-    async def fake_download(path, dest):
+    async def fake_download(path, dest, **kwargs):
         dest.write(b"fake-image-bytes")
 
     msg.bot.download_file = AsyncMock(side_effect=fake_download)
@@ -36,17 +36,21 @@ class TestPhotoHandler:
         mock_parser = MagicMock()
         mock_parser.parse_and_store = AsyncMock(return_value="Receipt parsed!")
 
-        with patch("src.bot.handlers.photo.ReceiptParser", return_value=mock_parser):
+        with patch("src.bot.handlers.photo.receipt_parser", mock_parser):
             await handle_photo(msg, sample_user)
 
         mock_parser.parse_and_store.assert_called_once()
+        assert (
+            mock_parser.parse_and_store.call_args.kwargs["image_data"]
+            == b"fake-image-bytes"
+        )
 
     async def test_sends_analyzing_message(self, sample_user):
         msg = _make_photo_message()
         mock_parser = MagicMock()
         mock_parser.parse_and_store = AsyncMock(return_value="Done!")
 
-        with patch("src.bot.handlers.photo.ReceiptParser", return_value=mock_parser):
+        with patch("src.bot.handlers.photo.receipt_parser", mock_parser):
             await handle_photo(msg, sample_user)
 
         # First call to answer should be the "analyzing" message
@@ -61,7 +65,7 @@ class TestPhotoHandler:
         mock_parser = MagicMock()
         mock_parser.parse_and_store = AsyncMock(return_value="Done!")
 
-        with patch("src.bot.handlers.photo.ReceiptParser", return_value=mock_parser):
+        with patch("src.bot.handlers.photo.receipt_parser", mock_parser):
             await handle_photo(msg, sample_user)
 
         # Should use the last photo (highest res)
@@ -74,7 +78,7 @@ class TestPhotoHandler:
             side_effect=Exception("Vision API failed")
         )
 
-        with patch("src.bot.handlers.photo.ReceiptParser", return_value=mock_parser):
+        with patch("src.bot.handlers.photo.receipt_parser", mock_parser):
             await handle_photo(msg, sample_user)
 
         last_answer = msg.answer.call_args_list[-1]
@@ -89,7 +93,7 @@ class TestPhotoHandler:
         file.file_path = None
         msg.bot.get_file = AsyncMock(return_value=file)
 
-        with patch("src.bot.handlers.photo.ReceiptParser"):
+        with patch("src.bot.handlers.photo.receipt_parser"):
             await handle_photo(msg, sample_user)
 
         last_answer = msg.answer.call_args_list[-1]
@@ -0,0 +1,64 @@
+"""Tests for the COPY-based bulk insert helpers."""
+
+import uuid
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+
+from src.db.bulk import copy_receipt_items
+from src.db.models import ReceiptItem
+from tests.factories import make_receipt, make_user
+
+pytestmark = [pytest.mark.db, pytest.mark.asyncio]
+
+
+class TestCopyReceiptItems:
+    @pytest.fixture
+    async def receipt(self, db_session):
+        user = make_user()
+        db_session.add(user)
+        await db_session.flush()
+        receipt = make_receipt(user_id=user.id)
+        db_session.add(receipt)
+        await db_session.flush()
+        return receipt
+
+    async def test_writes_rows_with_nullable_columns_omitted(self, db_session, receipt):
+        await copy_receipt_items(
+            db_session,
+            [
+                {
+                    "id": uuid.uuid4(),
+                    "receipt_id": receipt.id,
+                    "name_on_receipt": "Bread",
+                    "quantity": Decimal("2"),
+                    "unit_price": Decimal("1.20"),
+                    "total_price": Decimal("2.40"),
+                }
+            ],
+        )
+
+        item = await db_session.scalar(select(ReceiptItem))
+        assert item.name_on_receipt == "Bread"
+        assert item.product_id is None
+        assert item.quantity == Decimal("2")
+
+    async def test_missing_required_value_raises(self, db_session, receipt):
+        row = {
+            "id": uuid.uuid4(),
+            "receipt_id": receipt.id,
+            "name_on_receipt": "Bread",
+            "unit_price": Decimal("1.20"),
+            "total_price": Decimal("1.20"),
+        }
+
+        # quantity has an ORM default only; COPY would not apply it
+        with pytest.raises(ValueError, match="quantity"):
+            await copy_receipt_items(db_session, [row])
+
+        assert await db_session.scalar(select(ReceiptItem)) is None
+
+    async def test_unknown_column_raises(self, db_session, receipt):
+        with pytest.raises(ValueError, match="qty"):
+            await copy_receipt_items(db_session, [{"qty": 1}])
@@ -1,5 +1,7 @@
 """Service tests for AnalyticsService with real PostgreSQL."""
 
+from datetime import date
+
 import pytest
 
 from src.services.analytics import AnalyticsService
@@ -28,6 +30,8 @@ class TestSpendingSummary:
         for entry in result["breakdown"]:
             assert "name" in entry
             assert "total" in entry
+        totals = [e["total"] for e in result["breakdown"]]
+        assert totals == sorted(totals, reverse=True)
 
     async def test_by_category(self, service, patch_db_session, seed_data):
         result = await service.get_spending_summary(
@@ -51,7 +55,20 @@ class TestSpendingSummary:
         result = await service.get_spending_summary(
             user_id=seed_data["user"].id, period="last_3_months", group_by="month"
         )
-        assert len(result["breakdown"]) > 0
+        periods = [e["period"] for e in result["breakdown"]]
+        assert periods
+        assert periods == sorted(periods)
+        assert all(date.fromisoformat(p).day == 1 for p in periods)
+
+    async def test_by_week_periods_are_iso_dates(
+        self, service, patch_db_session, seed_data
+    ):
+        result = await service.get_spending_summary(
+            user_id=seed_data["user"].id, period="last_3_months", group_by="week"
+        )
+        periods = [e["period"] for e in result["breakdown"]]
+        assert periods
+        assert all(date.fromisoformat(p).weekday() == 0 for p in periods)
 
     async def test_filtered_by_store(self, service, patch_db_session, seed_data):
         result = await service.get_spending_summary(
@@ -59,6 +76,30 @@ class TestSpendingSummary:
         )
         assert result["total_spent"] > 0
 
+    async def test_store_filter_applies_to_breakdowns(
+        self, service, patch_db_session, seed_data
+    ):
+        user_id = seed_data["user"].id
+        by_store = await service.get_spending_summary(
+            user_id=user_id, period="last_3_months", group_by="store", store="Mercadona"
+        )
+        assert {e["name"] for e in by_store["breakdown"]} == {"Mercadona"}
+
+        by_day = await service.get_spending_summary(
+            user_id=user_id, period="last_3_months", group_by="day", store="Mercadona"
+        )
+        assert sum(e["total"] for e in by_day["breakdown"]) == pytest.approx(
+            by_day["total_spent"]
+        )
+
+        by_product = await service.get_spending_summary(
+            user_id=user_id,
+            period="last_3_months",
+            group_by="product",
+            store="Mercadona",
+        )
+        assert by_product["breakdown"]
+
     async def test_custom_date_range(self, service, patch_db_session, seed_data):
         result = await service.get_spending_summary(
             user_id=seed_data["user"].id,
@@ -75,6 +116,15 @@ class TestSpendingSummary:
         )
         assert result["total_spent"] == 0
         assert result["receipt_count"] == 0
+        assert result["average_per_receipt"] == 0
+
+    async def test_average_per_receipt(self, service, patch_db_session, seed_data):
+        result = await service.get_spending_summary(
+            user_id=seed_data["user"].id, period="last_3_months"
+        )
+        assert result["average_per_receipt"] == pytest.approx(
+            result["total_spent"] / result["receipt_count"], abs=0.01
+        )
 
 
 class TestFrequentPurchases:
@@ -90,6 +140,13 @@ class TestFrequentPurchases:
         # Should be sorted by times_bought descending
         counts = [item["times_bought"] for item in result["frequent_items"]]
         assert counts == sorted(counts, reverse=True)
+        assert set(result["frequent_items"][0]) == {
+            "product",
+            "times_bought",
+            "total_quantity",
+            "total_spent",
+            "average_price",
+        }
 
     async def test_respects_limit(self, service, patch_db_session, seed_data):
         result = await service.get_frequent_purchases(
@@ -117,6 +174,7 @@ class TestComparePrices:
         for entry in result["comparisons"]:
             assert "store" in entry
             assert "average_price" in entry
+            assert isinstance(entry["average_price"], float)
 
     async def test_single_store(self, service, patch_db_session, seed_data):
         result = await service.compare_prices(
@@ -3,8 +3,11 @@
 from datetime import date
 
 import pytest
+from sqlalchemy import select
 
+from src.db.models import Discount
 from src.services.discount import DiscountService
+from tests.factories import make_product
 
 pytestmark = [pytest.mark.service, pytest.mark.asyncio]
 
@@ -39,6 +42,15 @@ class TestRegisterDiscount:
         )
         assert result["status"] == "success"
 
+    async def test_reuses_existing_store(self, service, patch_db_session, seed_data):
+        result = await service.register_discount(
+            store_name="mercadona",
+            discount_type="percentage",
+            value=10.0,
+        )
+        assert result["status"] == "success"
+        assert "Mercadona" in result["message"]
+
     async def test_with_product(self, service, patch_db_session, seed_data):
         result = await service.register_discount(
             store_name="Mercadona",
@@ -48,6 +60,25 @@ class TestRegisterDiscount:
         )
         assert result["status"] == "success"
 
+    async def test_prefers_exact_product_name(self, service, patch_db_session):
+        products = [
+            make_product(canonical_name=name, aliases=[])
+            for name in ("Milk Chocolate", "Oat Milk", "Milk")
+        ]
+        patch_db_session.add_all(products)
+        await patch_db_session.flush()
+
+        result = await service.register_discount(
+            store_name="Mercadona",
+            discount_type="percentage",
+            value=10.0,
+            product_name="milk",
+        )
+
+        assert result["status"] == "success"
+        product_id = await patch_db_session.scalar(select(Discount.product_id))
+        assert product_id == products[2].id
+
     async def test_store_wide(self, service, patch_db_session):
         result = await service.register_discount(
             store_name="Lidl",
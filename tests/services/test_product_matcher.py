@@ -1,8 +1,14 @@
 """Service tests for the ProductMatcher with real PostgreSQL."""
 
+import uuid
+from unittest.mock import patch
+
 import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
 
-from src.services.product import ProductMatcher
+from src.db.models import Product
+from src.services.product import ProductMatcher, _ProductIndex
 from src.services.product_intelligence import ItemIntelligence
 from tests.factories import make_product
 
@@ -75,6 +81,23 @@ class TestProductMatcher:
                 a.lower() for a in (product.aliases or [])
             ] or "chicken breast fillet" in (product.aliases or [])
 
+    async def test_alias_appended_in_database(self, matcher, db_session):
+        existing = make_product(canonical_name="Chicken Breast", aliases=["Pollo"])
+        db_session.add(existing)
+        await db_session.flush()
+
+        product, is_new = await matcher.find_or_create_product(
+            "breast chicken", db_session
+        )
+
+        assert is_new is False
+        assert product.aliases == ["Pollo", "breast chicken"]
+        assert product not in db_session.dirty
+        stored = await db_session.scalar(
+            select(Product.aliases).where(Product.id == existing.id)
+        )
+        assert stored == ["Pollo", "breast chicken"]
+
     async def test_duplicate_alias_not_added(self, matcher, db_session):
         existing = make_product(canonical_name="Milk", aliases=["Milk", "LECHE"])
         db_session.add(existing)
@@ -111,3 +134,106 @@ class TestProductMatcher:
         assert is_new is True
         assert product.canonical_name == "Chicken Breast"
         assert product.category_id is not None
+
+
+class TestProductIndex:
+    @pytest.fixture
+    def index(self):
+        index = _ProductIndex(ttl=300)
+        with patch("src.services.product._PRODUCT_INDEX", index):
+            yield index
+
+    async def test_created_product_matches_without_reload(self, index, db_session):
+        matcher = ProductMatcher()
+        created, _ = await matcher.find_or_create_product("Chicken Breast", db_session)
+
+        with patch("src.services.product.readonly_session") as reload_session:
+            product, is_new = await matcher.find_or_create_product(
+                "Chicken Breast", db_session
+            )
+
+        assert is_new is False
+        assert product.id == created.id
+        reload_session.assert_not_called()
+
+    async def test_word_order_and_case_ignored(self, index, db_session):
+        await index.ensure_loaded()
+        product_id = uuid.uuid4()
+        index.add(product_id, ["Leche Entera Hacendado"])
+
+        assert index.best_match("hacendado, LECHE entera", 90) == (product_id, 100.0)
+
+    async def test_stale_entry_triggers_reload(self, index, db_session):
+        await index.ensure_loaded()
+        index.add(uuid.uuid4(), ["Milk"])  # e.g. a product deleted since indexed
+
+        # Written behind the index's back, e.g. by another process
+        existing = make_product(canonical_name="Milk", aliases=["Milk"])
+        db_session.add(existing)
+        await db_session.flush()
+
+        product, is_new = await ProductMatcher().find_or_create_product(
+            "Milk", db_session
+        )
+        assert is_new is False
+        assert product.id == existing.id
+
+    async def test_product_shared_only_after_commit(self, index, db_engine):
+        factory = async_sessionmaker(db_engine, expire_on_commit=False)
+        matcher = ProductMatcher()
+
+        with patch("src.services.product.readonly_session", factory):
+            async with factory() as session:
+                await matcher.find_or_create_product("Oat Milk", session)
+                assert index.best_match("Oat Milk", 80) is None
+                await session.rollback()
+            assert index.best_match("Oat Milk", 80) is None
+
+            async with factory() as session:
+                created, _ = await matcher.find_or_create_product("Oat Milk", session)
+                await session.commit()
+        assert index.best_match("Oat Milk", 80) == (created.id, 100.0)
+
+    async def test_reload_skips_uncommitted_products(self, index, db_engine):
+        factory = async_sessionmaker(db_engine, expire_on_commit=False)
+
+        with patch("src.services.product.readonly_session", factory):
+            async with factory() as session:
+                session.add(make_product(canonical_name="Oat Milk", aliases=[]))
+                await session.flush()
+                index.invalidate()
+                await index.ensure_loaded()
+
+                assert index.best_match("Oat Milk", 80) is None
+                await session.rollback()
+
+    async def test_addition_during_reload_is_kept(self, index, db_session):
+        product_id = uuid.uuid4()
+
+        class ReloadSession:
+            async def __aenter__(self):
+                return db_session
+
+            async def __aexit__(self, *args):
+                # Committed by another session while the reload query ran
+                index.add(product_id, ["Oat Milk"])
+
+        with patch("src.services.product.readonly_session", side_effect=ReloadSession):
+            await index.ensure_loaded()
+
+        assert index.best_match("Oat Milk", 80) == (product_id, 100.0)
+
+    async def test_miss_reloads_index_before_creating(self, index, db_session):
+        await index.ensure_loaded()
+        # Written behind the index's back, e.g. by another process
+        existing = make_product(canonical_name="Oat Milk", aliases=[])
+        db_session.add(existing)
+        await db_session.flush()
+
+        with patch("src.services.product.PRODUCT_INDEX_MISS_RELOAD_SECONDS", 0):
+            product, is_new = await ProductMatcher().find_or_create_product(
+                "Oat Milk", db_session
+            )
+
+        assert is_new is False
+        assert product.id == existing.id
@@ -1,11 +1,12 @@
 """Service tests for PurchaseService with real PostgreSQL."""
 
+import uuid
 from datetime import date, timedelta
 
 import pytest
 from sqlalchemy import select
 
-from src.db.models import Store
+from src.db.models import ReceiptItem, Store
 from src.services.purchase import PurchaseService
 
 pytestmark = [pytest.mark.service, pytest.mark.asyncio]
@@ -88,6 +89,24 @@ class TestAddManualPurchase:
         )
         assert result["total"] == pytest.approx(7.50, abs=0.01)
 
+    async def test_persists_items(self, service, patch_db_session, db_session):
+        user_id = await _get_user_id(db_session)
+        result = await service.add_manual_purchase(
+            user_id=user_id,
+            store_name="Lidl",
+            items=[
+                {"name": "Bread", "unit_price": 1.20, "quantity": 2},
+                {"name": "Milk", "unit_price": 1.10},
+            ],
+        )
+
+        stmt = select(ReceiptItem).where(
+            ReceiptItem.receipt_id == uuid.UUID(result["receipt_id"])
+        )
+        items = (await db_session.execute(stmt)).scalars().all()
+        assert sorted(item.name_on_receipt for item in items) == ["Bread", "Milk"]
+        assert all(item.product_id is not None for item in items)
+
 
 class TestSearchPurchases:
     async def test_by_store(self, patch_db_session, db_session, seed_data):
@@ -0,0 +1,56 @@
+"""Service tests for the product reprocessing script with real PostgreSQL."""
+
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy import func, select, update
+
+from scripts.reprocess_products import _enrich_products
+from src.db.models import Product
+from src.services.product import ProductMatcher
+from src.services.product_intelligence import ItemIntelligence
+from tests.factories import make_category, make_product
+
+pytestmark = [pytest.mark.service, pytest.mark.asyncio]
+
+
+class TestEnrichProducts:
+    async def test_alias_appended_meanwhile_is_kept(self, db_session):
+        category = make_category(name="Dairy")
+        product = make_product(
+            canonical_name="Milk", aliases=["Milk"], category_id=category.id
+        )
+        db_session.add_all([category, product])
+        await db_session.flush()
+
+        async def enrich_items(names):
+            # The matcher appends an alias after the chunk was read
+            await db_session.execute(
+                update(Product)
+                .where(Product.id == product.id)
+                .values(aliases=func.array_cat(Product.aliases, ["Leche"]))
+                .execution_options(synchronize_session=False)
+            )
+            return {
+                name: ItemIntelligence(
+                    source_name=name,
+                    canonical_name_en="Milk",
+                    aliases_en=["Whole Milk"],
+                    category_path_en="Dairy & Eggs > Milk",
+                    confidence=0.9,
+                )
+                for name in names
+            }
+
+        intelligence = MagicMock()
+        intelligence.enrich_items = enrich_items
+
+        updated = await _enrich_products(
+            db_session, [product], ProductMatcher(), intelligence
+        )
+
+        assert updated == 1
+        stored = await db_session.scalar(
+            select(Product.aliases).where(Product.id == product.id)
+        )
+        assert stored == ["Milk", "Leche", "Whole Milk"]
@@ -1,9 +1,12 @@
 """Unit tests for the authentication middleware."""
 
+import asyncio
 import uuid
+from contextlib import contextmanager
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+from aiogram.types import CallbackQuery, Message
 
 from src.bot.middlewares.auth import AuthMiddleware
 from src.db.models import User
@@ -11,32 +14,21 @@ from src.db.models import User
 pytestmark = pytest.mark.unit
 
 
-def _make_update(
+def _make_event(
     tg_id: int = 111,
     username: str = "alice",
     first_name: str = "Alice",
     is_callback: bool = False,
 ):
-    """Create a mock Update with a from_user."""
-    from aiogram.types import Update
+    """Create a mock Message (or CallbackQuery) with a from_user."""
+    event = MagicMock(spec=CallbackQuery if is_callback else Message)
 
-    update = MagicMock(spec=Update)
+    event.from_user = MagicMock()
+    event.from_user.id = tg_id
+    event.from_user.username = username
+    event.from_user.first_name = first_name
 
-    user_mock = MagicMock()
-    user_mock.id = tg_id
-    user_mock.username = username
-    user_mock.first_name = first_name
-
-    if is_callback:
-        update.message = None
-        update.callback_query = MagicMock()
-        update.callback_query.from_user = user_mock
-    else:
-        update.message = MagicMock()
-        update.message.from_user = user_mock
-        update.callback_query = None
-
-    return update
+    return event
 
 
 def _make_session_mock(existing_user: User | None = None):
@@ -46,11 +38,20 @@ def _make_session_mock(existing_user: User | None = None):
     result.scalar_one_or_none.return_value = existing_user
     session.execute = AsyncMock(return_value=result)
     session.add = MagicMock()
-    session.commit = AsyncMock()
-    session.refresh = AsyncMock()
+    session.begin = MagicMock(return_value=AsyncMock())
     return session
 
 
+@contextmanager
+def _patch_sessions(ctx):
+    """Serve both the read-only and the read-write session from ctx."""
+    with (
+        patch("src.bot.middlewares.auth.readonly_session", return_value=ctx) as ro,
+        patch("src.bot.middlewares.auth.async_session", return_value=ctx),
+    ):
+        yield ro
+
+
 class TestAuthMiddleware:
     @pytest.fixture
     def middleware(self):
@@ -63,14 +64,14 @@ class TestAuthMiddleware:
         ctx.__aexit__ = AsyncMock(return_value=False)
 
         handler = AsyncMock(return_value="ok")
-        update = _make_update(tg_id=999)
+        event = _make_event(tg_id=999)
         data: dict = {}
 
-        with patch("src.bot.middlewares.auth.async_session", return_value=ctx):
-            await middleware(handler, update, data)
+        with _patch_sessions(ctx):
+            await middleware(handler, event, data)
 
         session.add.assert_called_once()
-        session.commit.assert_called()
+        session.begin.assert_called_once()
         assert "db_user" in data
 
     async def test_existing_user_is_found(self, middleware):
@@ -83,11 +84,11 @@ class TestAuthMiddleware:
         ctx.__aexit__ = AsyncMock(return_value=False)
 
         handler = AsyncMock(return_value="ok")
-        update = _make_update(tg_id=111)
+        event = _make_event(tg_id=111)
         data: dict = {}
 
-        with patch("src.bot.middlewares.auth.async_session", return_value=ctx):
-            await middleware(handler, update, data)
+        with _patch_sessions(ctx):
+            await middleware(handler, event, data)
 
         session.add.assert_not_called()
         assert data["db_user"] is existing
@@ -102,27 +103,35 @@ class TestAuthMiddleware:
         ctx.__aexit__ = AsyncMock(return_value=False)
 
         handler = AsyncMock()
-        update = _make_update(tg_id=111, username="new_name")
+        event = _make_event(tg_id=111, username="new_name")
         data: dict = {}
 
-        with patch("src.bot.middlewares.auth.async_session", return_value=ctx):
-            await middleware(handler, update, data)
+        with _patch_sessions(ctx):
+            await middleware(handler, event, data)
 
         assert existing.username == "new_name"
-        session.commit.assert_called()
+        session.begin.assert_called_once()
 
     async def test_no_user_in_event_passes_through(self, middleware):
-        from aiogram.types import Update
-
-        update = MagicMock(spec=Update)
-        update.message = None
-        update.callback_query = None
+        event = MagicMock(spec=Message)
+        event.from_user = None
 
         handler = AsyncMock(return_value="ok")
         data: dict = {}
 
-        _ = await middleware(handler, update, data)
-        handler.assert_called_once_with(update, data)
+        _ = await middleware(handler, event, data)
+        handler.assert_called_once_with(event, data)
+        assert "db_user" not in data
+
+    async def test_skip_auth_flag_bypasses_lookup(self, middleware):
+        handler = AsyncMock(return_value="ok")
+        data: dict = {"handler": MagicMock(flags={"skip_auth": True})}
+
+        with patch("src.bot.middlewares.auth.readonly_session") as read_session:
+            _ = await middleware(handler, _make_event(tg_id=111), data)
+
+        read_session.assert_not_called()
+        handler.assert_called_once()
         assert "db_user" not in data
 
     async def test_handler_receives_db_user(self, middleware):
@@ -135,11 +144,11 @@ class TestAuthMiddleware:
         ctx.__aexit__ = AsyncMock(return_value=False)
 
         handler = AsyncMock()
-        update = _make_update(tg_id=111)
+        event = _make_event(tg_id=111)
         data: dict = {}
 
-        with patch("src.bot.middlewares.auth.async_session", return_value=ctx):
-            await middleware(handler, update, data)
+        with _patch_sessions(ctx):
+            await middleware(handler, event, data)
 
         handler.assert_called_once()
         _, call_data = handler.call_args.args
@@ -155,10 +164,83 @@ class TestAuthMiddleware:
         ctx.__aexit__ = AsyncMock(return_value=False)
 
         handler = AsyncMock()
-        update = _make_update(tg_id=222, is_callback=True)
+        event = _make_event(tg_id=222, is_callback=True)
         data: dict = {}
 
-        with patch("src.bot.middlewares.auth.async_session", return_value=ctx):
-            await middleware(handler, update, data)
+        with _patch_sessions(ctx):
+            await middleware(handler, event, data)
+
+        assert data["db_user"] is existing
+
+    async def test_repeat_update_served_from_cache(self, middleware):
+        existing = User(
+            id=uuid.uuid4(), telegram_id=111, username="alice", first_name="Alice"
+        )
+        session = _make_session_mock(existing_user=existing)
+        ctx = AsyncMock()
+        ctx.__aenter__ = AsyncMock(return_value=session)
+        ctx.__aexit__ = AsyncMock(return_value=False)
 
+        handler = AsyncMock()
+        with _patch_sessions(ctx) as factory:
+            await middleware(handler, _make_event(tg_id=111), {})
+            data: dict = {}
+            await middleware(handler, _make_event(tg_id=111), data)
+
+        factory.assert_called_once()
         assert data["db_user"] is existing
+
+    async def test_profile_change_bypasses_cache(self, middleware):
+        existing = User(
+            id=uuid.uuid4(), telegram_id=111, username="alice", first_name="Alice"
+        )
+        session = _make_session_mock(existing_user=existing)
+        ctx = AsyncMock()
+        ctx.__aenter__ = AsyncMock(return_value=session)
+        ctx.__aexit__ = AsyncMock(return_value=False)
+
+        handler = AsyncMock()
+        with _patch_sessions(ctx) as factory:
+            await middleware(handler, _make_event(tg_id=111), {})
+            await middleware(handler, _make_event(tg_id=111, username="alice2"), {})
+
+        assert factory.call_count == 2
+        assert existing.username == "alice2"
+
+    async def test_concurrent_updates_share_one_lookup(self, middleware):
+        existing = User(
+            id=uuid.uuid4(), telegram_id=111, username="alice", first_name="Alice"
+        )
+        session = _make_session_mock(existing_user=existing)
+        ctx = AsyncMock()
+        ctx.__aenter__ = AsyncMock(return_value=session)
+        ctx.__aexit__ = AsyncMock(return_value=False)
+
+        handler = AsyncMock()
+        datas: list[dict] = [{} for _ in range(5)]
+        with _patch_sessions(ctx) as factory:
+            await asyncio.gather(
+                *(middleware(handler, _make_event(tg_id=111), d) for d in datas)
+            )
+
+        factory.assert_called_once()
+        assert all(d["db_user"] is existing for d in datas)
+        assert middleware._in_flight == {}
+
+    async def test_unchanged_user_skips_write_session(self, middleware):
+        existing = User(
+            id=uuid.uuid4(), telegram_id=111, username="alice", first_name="Alice"
+        )
+        session = _make_session_mock(existing_user=existing)
+        ctx = AsyncMock()
+        ctx.__aenter__ = AsyncMock(return_value=session)
+        ctx.__aexit__ = AsyncMock(return_value=False)
+
+        with (
+            patch("src.bot.middlewares.auth.readonly_session", return_value=ctx),
+            patch("src.bot.middlewares.auth.async_session") as write_session,
+        ):
+            await middleware(AsyncMock(), _make_event(tg_id=111), {})
+
+        write_session.assert_not_called()
+        session.begin.assert_not_called()
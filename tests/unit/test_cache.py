@@ -0,0 +1,33 @@
+"""Tests for the in-process TTL cache."""
+
+import pytest
+
+from src.cache import TTLCache
+
+pytestmark = pytest.mark.unit
+
+
+class TestTTLCache:
+    def test_evicts_least_recently_used(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")
+        cache.set("c", "3")
+
+        assert cache.get("a") == "1"
+        assert cache.get("b") is None
+        assert cache.get("c") == "3"
+
+    def test_expired_entries_are_dropped(self):
+        cache = TTLCache(maxsize=2, ttl=-1)
+        cache.set("a", "1")
+
+        assert cache.get("a") is None
+
+    def test_clear(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", "1")
+        cache.clear()
+
+        assert cache.get("a") is None
@@ -43,6 +43,7 @@ class TestConfig:
         assert s.conversational_model == "gpt-4o-mini"
         assert s.vision_model == "gpt-4o"
         assert s.rate_limit_per_minute == 20
+        assert s.agent_concurrency == 32
         assert s.log_level == "INFO"
 
     def test_missing_required_raises(self):
@@ -0,0 +1,31 @@
+"""Unit tests for primary-key generation."""
+
+import time
+
+import pytest
+
+from src.db.ids import uuid7
+
+pytestmark = pytest.mark.unit
+
+
+class TestUuid7:
+    def test_version_and_variant(self):
+        value = uuid7()
+        assert value.version == 7
+        assert value.variant == "specified in RFC 4122"
+
+    def test_embeds_current_millisecond_timestamp(self):
+        before = time.time_ns() // 1_000_000
+        value = uuid7()
+        after = time.time_ns() // 1_000_000
+        assert before <= value.int >> 80 <= after
+
+    def test_ids_from_later_milliseconds_sort_after(self):
+        first = uuid7()
+        time.sleep(0.002)
+        second = uuid7()
+        assert first < second
+
+    def test_unique(self):
+        assert len({uuid7() for _ in range(1000)}) == 1000
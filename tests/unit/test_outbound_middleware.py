@@ -0,0 +1,66 @@
+"""Unit tests for the outbound request throttle."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from aiogram.methods import GetFile, SendChatAction, SendMessage
+
+from src.bot.middlewares.outbound import OutboundThrottleMiddleware
+
+pytestmark = pytest.mark.unit
+
+
+class TestOutboundThrottleMiddleware:
+    @pytest.fixture
+    def middleware(self):
+        return OutboundThrottleMiddleware()
+
+    async def test_message_is_sent(self, middleware):
+        make_request = AsyncMock(return_value="sent")
+        method = SendMessage(chat_id=1, text="hi")
+
+        result = await middleware(make_request, MagicMock(), method)
+
+        assert result == "sent"
+        make_request.assert_called_once()
+
+    async def test_typing_is_passed_through(self, middleware):
+        make_request = AsyncMock(return_value=True)
+        typing = SendChatAction(chat_id=1, action="typing")
+        middleware._tokens = 0.0
+
+        with patch(
+            "src.bot.middlewares.outbound.asyncio.sleep", new=AsyncMock()
+        ) as sleep:
+            await middleware(make_request, MagicMock(), typing)
+            result = await middleware(make_request, MagicMock(), typing)
+
+        assert result is True
+        assert make_request.call_count == 2
+        sleep.assert_not_awaited()
+
+    async def test_waits_when_bucket_is_empty(self, middleware):
+        make_request = AsyncMock()
+        middleware._tokens = 0.0
+
+        with patch(
+            "src.bot.middlewares.outbound.asyncio.sleep", new=AsyncMock()
+        ) as sleep:
+            await middleware(
+                make_request, MagicMock(), SendMessage(chat_id=1, text="x")
+            )
+
+        sleep.assert_awaited_once()
+        make_request.assert_called_once()
+
+    async def test_other_methods_are_not_paced(self, middleware):
+        make_request = AsyncMock()
+        middleware._tokens = 0.0
+
+        with patch(
+            "src.bot.middlewares.outbound.asyncio.sleep", new=AsyncMock()
+        ) as sleep:
+            await middleware(make_request, MagicMock(), GetFile(file_id="f"))
+
+        sleep.assert_not_awaited()
+        make_request.assert_called_once()
@@ -0,0 +1,78 @@
+"""Unit tests for LLM item enrichment batching with a mocked completion."""
+
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.services.product_intelligence import (
+    ENRICH_BATCH_SIZE,
+    ProductIntelligenceService,
+)
+
+pytestmark = pytest.mark.unit
+
+
+def _completion_for(names: list[str]) -> MagicMock:
+    content = json.dumps(
+        {
+            "items": [
+                {
+                    "source_name": name,
+                    "canonical_name_en": name.title(),
+                    "aliases_en": [name],
+                    "category_path_en": "Dairy & Eggs > Milk",
+                    "confidence": 0.9,
+                }
+                for name in names
+            ]
+        }
+    )
+    resp = MagicMock()
+    resp.choices = [MagicMock(message=MagicMock(content=content))]
+    return resp
+
+
+@pytest.fixture
+def llm_enabled(override_settings):
+    override_settings(
+        enable_item_intelligence=True,
+        openai_api_key="sk-real",
+        gemini_api_key="real",
+    )
+
+
+class TestEnrichItems:
+    async def test_large_input_is_split_into_batches(self, llm_enabled):
+        names = [f"item {i}" for i in range(ENRICH_BATCH_SIZE * 3 + 5)]
+        batch_sizes: list[int] = []
+
+        async def fake_completion(**kwargs):
+            batch = json.loads(kwargs["messages"][1]["content"])["items"]
+            batch_sizes.append(len(batch))
+            return _completion_for(batch)
+
+        with patch("litellm.acompletion", side_effect=fake_completion):
+            result = await ProductIntelligenceService().enrich_items(names)
+
+        assert len(batch_sizes) == 4
+        assert max(batch_sizes) <= ENRICH_BATCH_SIZE
+        assert set(result) == set(names)
+        assert all(item.confidence == 0.9 for item in result.values())
+
+    async def test_failed_batch_falls_back_alone(self, llm_enabled):
+        names = [f"item {i}" for i in range(ENRICH_BATCH_SIZE + 1)]
+
+        async def fake_completion(**kwargs):
+            batch = json.loads(kwargs["messages"][1]["content"])["items"]
+            if len(batch) == 1:
+                resp = MagicMock()
+                resp.choices = [MagicMock(message=MagicMock(content='{"items": [{'))]
+                return resp
+            return _completion_for(batch)
+
+        with patch("litellm.acompletion", side_effect=fake_completion):
+            result = await ProductIntelligenceService().enrich_items(names)
+
+        assert result[names[-1]].confidence == 0.0
+        assert all(result[name].confidence == 0.9 for name in names[:-1])
@@ -2,7 +2,7 @@
 
 import pytest
 
-from src.agent.prompts import build_system_prompt
+from src.agent.prompts import SYSTEM_PROMPT, build_system_prompt
 
 pytestmark = pytest.mark.unit
 
@@ -36,3 +36,24 @@ class TestBuildSystemPrompt:
         prompt = build_system_prompt(user_name="X", user_id="1")
         assert "EUR" in prompt
         assert "UTC" in prompt
+
+    def test_matches_template_format(self):
+        prompt = build_system_prompt(
+            user_name="Alice",
+            user_id="abc-123",
+            currency="USD",
+            timezone="Europe/Madrid",
+            current_date="2026-02-11",
+        )
+        assert prompt == SYSTEM_PROMPT.format(
+            user_name="Alice",
+            user_id="abc-123",
+            currency="USD",
+            timezone="Europe/Madrid",
+            current_date="2026-02-11",
+        )
+
+    def test_repeated_calls_reuse_cached_prompt(self):
+        first = build_system_prompt(user_name="X", user_id="1")
+        second = build_system_prompt(user_name="X", user_id="1")
+        assert first is second
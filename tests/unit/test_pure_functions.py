@@ -4,6 +4,7 @@ from datetime import date, timedelta
 
 import pytest
 
+from src.services.analytics import _resolve_date_range as _resolve_analytics_range
 from src.services.purchase import (
     _normalize_store_name,
     _parse_date,
@@ -83,3 +84,11 @@ class TestResolveDateRange:
 
     def test_none_defaults(self):
         assert _resolve_date_range(None, None, None) == (None, None)
+
+    def test_analytics_defaults_to_this_month(self):
+        today = date.today()
+        assert _resolve_analytics_range(None, None, None) == (
+            today.replace(day=1),
+            today,
+        )
+        assert _resolve_analytics_range("all_time", None, None) == (None, None)
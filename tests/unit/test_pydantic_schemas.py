@@ -1,5 +1,7 @@
 """Unit tests for Pydantic receipt extraction schemas."""
 
+from decimal import Decimal
+
 import pytest
 from pydantic import ValidationError
 
@@ -12,7 +14,7 @@ class TestExtractedItem:
     def test_valid(self):
         item = ExtractedItem(name="Chicken", unit_price=5.99, total_price=5.99)
         assert item.name == "Chicken"
-        assert item.unit_price == 5.99
+        assert item.unit_price == Decimal("5.99")
 
     def test_defaults(self):
         item = ExtractedItem(name="Milk", unit_price=1.10, total_price=1.10)
@@ -55,8 +55,8 @@ class TestRateLimitMiddleware:
         for _ in range(3):
             await middleware(handler, msg, {})
 
-        # Simulate time passing (clear the internal timestamps)
-        middleware._timestamps[300] = [time.monotonic() - 120]  # 2 minutes ago
+        # Simulate time passing (empty bucket last touched 2 minutes ago)
+        middleware._buckets[300] = (0.0, time.monotonic() - 120)
 
         handler.reset_mock()
         _ = await middleware(handler, msg, {})
@@ -81,3 +81,33 @@ class TestRateLimitMiddleware:
         cb = MagicMock(spec=CallbackQuery)
         _ = await middleware(handler, cb, {})
         handler.assert_called_once()
+
+    async def test_idle_users_are_evicted(self, middleware):
+        handler = AsyncMock(return_value="ok")
+        middleware._buckets[500] = (0.0, time.monotonic() - 120)
+
+        await middleware(handler, _make_message(user_id=501), {})
+
+        assert 500 not in middleware._buckets
+        assert 501 in middleware._buckets
+
+    async def test_tokens_refill_over_time(self, middleware):
+        handler = AsyncMock(return_value="ok")
+        msg = _make_message(user_id=600)
+
+        # Empty bucket last refilled 20 s ago: 3 per minute -> one token back
+        middleware._buckets[600] = (0.0, time.monotonic() - 20)
+        await middleware(handler, msg, {})
+        handler.assert_called_once()
+
+        handler.reset_mock()
+        await middleware(handler, msg, {})
+        handler.assert_not_called()
+
+    async def test_tracked_users_are_capped(self, middleware):
+        handler = AsyncMock(return_value="ok")
+        with patch("src.bot.middlewares.rate_limit.MAX_TRACKED_USERS", 2):
+            for user_id in (700, 701, 702):
+                await middleware(handler, _make_message(user_id=user_id), {})
+
+        assert list(middleware._buckets) == [701, 702]
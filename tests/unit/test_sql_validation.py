@@ -63,3 +63,12 @@ class TestValidateSQL:
     def test_reject_grant(self):
         ok, err = _validate_sql("GRANT ALL ON users TO evil")
         assert ok is False
+
+    def test_reject_keyword_after_newline(self):
+        ok, err = _validate_sql("SELECT 1;\nDROP TABLE users")
+        assert ok is False
+        assert "DROP" in err
+
+    def test_keyword_inside_identifier_allowed(self):
+        ok, err = _validate_sql("SELECT created_at, updated FROM receipts")
+        assert ok is True
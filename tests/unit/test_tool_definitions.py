@@ -1,8 +1,10 @@
 """Unit tests for structural validation of LLM tool definitions."""
 
+import inspect
+
 import pytest
 
-from src.agent.tool_executor import ToolExecutor
+from src.agent.tool_executor import _TOOL_ROUTES, TOOL_NAMES, ToolExecutor
 from src.agent.tools import TOOL_DEFINITIONS
 
 pytestmark = pytest.mark.unit
@@ -39,9 +41,21 @@ class TestToolDefinitions:
                 assert isinstance(params["required"], list)
 
     def test_tool_names_match_executor(self):
-        executor = ToolExecutor()
         tool_names = {t["function"]["name"] for t in TOOL_DEFINITIONS}
-        handler_names = set(executor._handlers.keys())
+        handler_names = TOOL_NAMES
         assert tool_names == handler_names, (
             f"Mismatch: tools={tool_names - handler_names}, handlers={handler_names - tool_names}"
         )
+
+    def test_tool_parameters_match_service_signatures(self):
+        executor = ToolExecutor()
+        for tool in TOOL_DEFINITIONS:
+            name = tool["function"]["name"]
+            route = _TOOL_ROUTES[name]
+            method = getattr(getattr(executor, route.service), route.method)
+            service_params = set(inspect.signature(method).parameters)
+            for arg in tool["function"]["parameters"].get("properties", {}):
+                assert route.renames.get(arg, arg) in service_params, (
+                    f"{name}: argument {arg!r} has no service parameter"
+                )
+            assert ("user_id" in service_params) == route.user_scoped, name